@@ -0,0 +1,17 @@
+from django.core.checks import Tags, Warning, register
+
+from core.response_cache import is_shared_cache
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Кэш ответов молча выключен, если кэш у каждого процесса свой."""
+    if is_shared_cache():
+        return []
+    return [Warning(
+        'Кэш по умолчанию — LocMemCache, отдельный у каждого воркера: '
+        'кэш анонимных ответов выключен.',
+        hint='Задайте CACHE_URL общего кэша, например '
+             'redis://cache:6379/0.',
+        id='core.W001',
+    )]
@@ -0,0 +1,151 @@
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+# Сжатые варианты в порядке предпочтения
+PREFERRED_ENCODINGS = ('br', 'gzip')
+
+
+def make_etag(*parts):
+    """Строит ETag из отметок версий, от которых зависит ответ."""
+    digest = hashlib.md5(
+        repr(parts).encode(), usedforsecurity=False
+    ).hexdigest()
+    return quote_etag(digest)
+
+
+def parse_accept_encoding(header):
+    """
+    {кодировка: q} из заголовка Accept-Encoding.
+
+    Кодировки приводятся к нижнему регистру; некорректный q считается
+    нулевым, то есть кодировка не принимается.
+    """
+    weights = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoding(request, encodings):
+    """
+    Сжатый вариант тела с наибольшим q в Accept-Encoding (RFC 9110,
+    12.5.3) или None, если отдать нужно тело без сжатия.
+
+    Кодировки с q=0 не выбираются никогда, * задаёт q для
+    не перечисленных кодировок, при равных q выигрывает порядок
+    PREFERRED_ENCODINGS. Явно указанный identity с большим q, чем
+    у сжатых вариантов, тоже означает тело без сжатия.
+    """
+    weights = parse_accept_encoding(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    default = weights.get('*', 0.0)
+    chosen, chosen_weight = None, 0.0
+    for encoding in PREFERRED_ENCODINGS:
+        weight = weights.get(encoding, default)
+        if encoding in encodings and weight > chosen_weight:
+            chosen, chosen_weight = encoding, weight
+    if weights.get('identity', 0.0) > chosen_weight:
+        return None
+    return chosen
+
+
+def prerendered_response(request, content, digest, encodings,
+                         last_modified=None,
+                         content_type='application/json'):
+    """
+    Ответ с заранее собранным и сжатым телом.
+
+    Вариант выбирается по Accept-Encoding; ETag строится из хэша
+    содержимого и у каждого варианта свой. Запрос не тратит время
+    ни на сериализацию, ни на сжатие.
+    """
+    encoding = choose_encoding(request, encodings)
+    if encoding:
+        content = encodings[encoding]
+        digest = f'{digest}-{encoding}'
+    etag = quote_etag(digest)
+    if last_modified is not None:
+        last_modified = int(last_modified.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы для list и retrieve.
+
+    Валидаторы ответа (ETag, Last-Modified) вычисляются методами
+    get_list_validators и get_detail_validators по дешёвым отметкам
+    версий ещё до запуска сериализаторов. Если клиент прислал
+    совпадающий валидатор, сразу возвращается 304 Not Modified.
+    """
+
+    def get_list_validators(self, request):
+        """Возвращает пару (etag, last_modified) для списка."""
+        return None, None
+
+    def get_detail_validators(self, request):
+        """Возвращает пару (etag, last_modified) для объекта."""
+        return None, None
+
+    def conditional_response(self, request, validators, handler,
+                             *args, **kwargs):
+        etag, last_modified = validators
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag:
+                response.headers.setdefault('ETag', etag)
+            if last_modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(last_modified)
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.get_list_validators(request),
+            super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.get_detail_validators(request),
+            super().retrieve, *args, **kwargs
+        )
@@ -9,3 +9,72 @@ AVATAR_UPLOAD_PATH = 'users/avatars/'
 
 # Константы для сериализаторов
 MIN_INGREDIENT_AMOUNT = 1
+# Сколько рецептов можно добавить или убрать одним пакетным запросом
+MAX_BULK_RECIPES = 100
+
+# Пагинация
+MAX_PAGE_SIZE = 100
+# Сколько подписок пользователя загружать целиком за один запрос;
+# при большем числе подписки проверяются постранично
+SUBSCRIBED_AUTHORS_FULL_LOAD_LIMIT = 1000
+
+# Индекс ингредиентов для автодополнения
+# Через сколько секунд процесс перестраивает индекс,
+# чтобы подхватить изменения из других процессов
+INGREDIENT_INDEX_TTL = 300
+# Степень сжатия готового JSON справочника: сжимается один раз на версию
+INGREDIENT_CATALOG_GZIP_LEVEL = 9
+INGREDIENT_CATALOG_BROTLI_QUALITY = 11
+
+# Индекс рецептов по ингредиентам: не чаще чем раз в
+# RECIPE_INDEX_SYNC_INTERVAL секунд сверяется с БД, при сверке заново
+# читает рецепты, изменённые не раньше чем за RECIPE_INDEX_SYNC_OVERLAP
+# секунд до прошлой сверки (транзакции фиксируются не мгновенно),
+# и полностью перестраивается раз в RECIPE_INDEX_TTL секунд
+RECIPE_INDEX_SYNC_INTERVAL = 1
+RECIPE_INDEX_SYNC_OVERLAP = 5
+RECIPE_INDEX_TTL = 300
+
+# Список покупок
+SHOPPING_LIST_CHUNK_SIZE = 500
+SHOPPING_LIST_FILENAME = 'shopping_list'
+
+# Сколько объектов сверять за один проход при пересчёте счётчиков
+COUNTERS_BATCH_SIZE = 1000
+
+# Импорт ингредиентов
+INGREDIENTS_FILE = 'data/ingredients.csv'
+INGREDIENTS_IMPORT_BATCH_SIZE = 1000
+
+# Метрики запросов
+SLOW_REQUEST_WORST_QUERIES = 3
+
+# Короткие ссылки
+# Сколько секунд помнить, есть ли рецепт: в памяти процесса и в общем кэше
+SHORT_LINK_LOCAL_TTL = 60
+SHORT_LINK_CACHE_TTL = 3600
+# Сколько секунд помнить, что рецепта нет: сигнал о новом рецепте
+# сбрасывает только кэш своего процесса (и locmem-кэш по умолчанию)
+SHORT_LINK_MISSING_TTL = 5
+# Сколько кодов держать в памяти процесса
+SHORT_LINK_LOCAL_SIZE = 10000
+# Сколько секунд браузеры и прокси могут хранить редирект
+SHORT_LINK_MAX_AGE = 86400
+# Как часто записывать накопленные переходы по ссылкам в БД
+SHORT_LINK_HITS_FLUSH_INTERVAL = 10
+
+# Лента подписок
+# Авторам с большим числом подписчиков ленты не рассылаются: их рецепты
+# подмешиваются в ленту при чтении
+FEED_FANOUT_LIMIT = 1000
+# Сколько последних рецептов автора добавлять в ленту при подписке
+FEED_BACKFILL_SIZE = 50
+FEED_BATCH_SIZE = 1000
+
+# Кэш ответов для анонимных запросов
+RESPONSE_CACHE_TTL = 300
+# Сколько секунд держится блокировка пересчёта одного ответа
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+# Как долго остальные запросы ждут пересчитанный ответ: попытки × секунды
+RESPONSE_CACHE_WAIT_ATTEMPTS = 20
+RESPONSE_CACHE_WAIT_INTERVAL = 0.05
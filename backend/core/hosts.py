@@ -0,0 +1,15 @@
+from django.conf import settings
+
+
+def get_local_host():
+    """
+    Хост из ALLOWED_HOSTS для запросов внутри процесса.
+
+    Тестовому клиенту и фабрике запросов нужен Host, который пропустит
+    проверка ALLOWED_HOSTS; шаблон '*' и ведущая точка поддомена для
+    этого не годятся.
+    """
+    return next(
+        (host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'),
+        'localhost'
+    )
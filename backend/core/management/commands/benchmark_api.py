@@ -0,0 +1,309 @@
+import json
+import re
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.hosts import get_local_host
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+PERCENTILES = (50, 95, 99)
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) ')
+
+
+def percentile(sorted_values, percent):
+    """Перцентиль по ближайшему рангу."""
+    index = max(0, round(len(sorted_values) * percent / 100) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class InProcessTransport:
+    """Запросы через тестовый клиент с подсчётом SQL-запросов."""
+
+    def __init__(self, token):
+        self.client = APIClient(HTTP_HOST=get_local_host())
+        self.token = token
+
+    def request(self, method, path, auth):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token}'} if auth else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, **headers)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+        return response.status_code, len(queries)
+
+
+class HttpTransport:
+    """Запросы к запущенному серверу (например, gunicorn).
+
+    Число SQL-запросов берётся из заголовка Server-Timing, если
+    на сервере включены метрики запросов.
+    """
+
+    def __init__(self, base_url, token):
+        import requests
+
+        self.errors = requests.RequestException
+        self.session = requests.Session()
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+
+    def request(self, method, path, auth):
+        headers = {'Authorization': f'Token {self.token}'} if auth else {}
+        try:
+            response = self.session.request(
+                method, self.base_url + path, headers=headers
+            )
+        except self.errors as error:
+            raise CommandError(f'{self.base_url}: {error}')
+        match = SERVER_TIMING_QUERIES.search(
+            response.headers.get('Server-Timing', '')
+        )
+        return response.status_code, int(match[1]) if match else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки, пропускную способность и число SQL-запросов '
+        'основных эндпоинтов API и сравнивает их с базовым прогоном'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера; без него запросы '
+                 'выполняются в текущем процессе'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Сколько замеров сделать для каждого эндпоинта'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Сколько запросов выполнить перед замерами'
+        )
+        parser.add_argument(
+            '--only', nargs='+', metavar='NAME',
+            help='Замерить только перечисленные эндпоинты'
+        )
+        parser.add_argument(
+            '--output', help='Куда сохранить результаты в формате JSON'
+        )
+        parser.add_argument(
+            '--baseline', help='JSON предыдущего прогона для сравнения'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 относительно базового прогона'
+        )
+
+    def get_user(self):
+        """Пользователь, у которого есть и корзина, и подписки."""
+        user = (
+            User.objects
+            .filter(shopping_carts__isnull=False, subscriptions__isnull=False)
+            .order_by('id').first()
+            or User.objects.order_by('id').first()
+        )
+        if user is None:
+            raise CommandError(
+                'База пуста: заполните её командой generate_load_data'
+            )
+        return user
+
+    def get_scenarios(self, user):
+        """Список (имя, [(метод, путь, с токеном), ...]).
+
+        Переключатели избранного и корзины делают пару POST/DELETE,
+        чтобы прогон не менял данные.
+        """
+        recipe = Recipe.objects.order_by('-favorites_count', 'id').first()
+        if recipe is None:
+            raise CommandError('В базе нет рецептов')
+        free = (
+            Recipe.objects
+            .exclude(favorites__user=user)
+            .exclude(shopping_carts__user=user)
+            .order_by('id').first()
+        )
+        ingredient = Ingredient.objects.order_by('id').first()
+        prefix = ingredient.name[:2] if ingredient else 'а'
+        author = Subscription.objects.filter(user=user).first()
+        author_id = author.author_id if author else recipe.author_id
+        scenarios = [
+            ('recipe_list', [('get', '/api/recipes/', False)]),
+            ('recipe_list_auth', [('get', '/api/recipes/', True)]),
+            ('recipe_list_limit_50', [
+                ('get', '/api/recipes/?limit=50', True)
+            ]),
+            ('recipe_detail', [
+                ('get', f'/api/recipes/{recipe.pk}/', True)
+            ]),
+            ('recipe_filter_author', [
+                ('get', f'/api/recipes/?author={author_id}', True)
+            ]),
+            ('recipe_filter_favorited', [
+                ('get', '/api/recipes/?is_favorited=1', True)
+            ]),
+            ('recipe_filter_cart', [
+                ('get', '/api/recipes/?is_in_shopping_cart=1', True)
+            ]),
+            ('subscriptions', [
+                ('get', '/api/users/subscriptions/?recipes_limit=3', True)
+            ]),
+            ('shopping_cart_download', [
+                ('get', '/api/recipes/download_shopping_cart/', True)
+            ]),
+            ('ingredient_search', [
+                ('get', f'/api/ingredients/?name={prefix}', False)
+            ]),
+        ]
+        if free is not None:
+            scenarios += [
+                ('favorite_toggle', [
+                    ('post', f'/api/recipes/{free.pk}/favorite/', True),
+                    ('delete', f'/api/recipes/{free.pk}/favorite/', True),
+                ]),
+                ('shopping_cart_toggle', [
+                    ('post', f'/api/recipes/{free.pk}/shopping_cart/', True),
+                    ('delete', f'/api/recipes/{free.pk}/shopping_cart/',
+                     True),
+                ]),
+            ]
+        return scenarios
+
+    def run_scenario(self, transport, steps, repeat, warmup):
+        for _ in range(warmup):
+            for method, path, auth in steps:
+                transport.request(method, path, auth)
+        timings = []
+        queries = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for method, path, auth in steps:
+                start = time.perf_counter()
+                status, count = transport.request(method, path, auth)
+                timings.append((time.perf_counter() - start) * 1000)
+                if status >= 400:
+                    raise CommandError(f'{method.upper()} {path}: {status}')
+                if count is not None:
+                    queries.append(count)
+        elapsed = time.perf_counter() - started
+        timings.sort()
+        result = {
+            f'p{percent}_ms': round(percentile(timings, percent), 3)
+            for percent in PERCENTILES
+        }
+        result['mean_ms'] = round(statistics.mean(timings), 3)
+        result['rps'] = round(len(timings) / elapsed, 1)
+        result['queries'] = max(queries) if queries else None
+        return result
+
+    def get_dataset(self):
+        return {
+            'users': User.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'ingredients': Ingredient.objects.count(),
+            'favorites': Favorite.objects.count(),
+            'shopping_carts': ShoppingCart.objects.count(),
+            'subscriptions': Subscription.objects.count(),
+        }
+
+    def find_regressions(self, results, baseline, tolerance):
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            limit = previous['p95_ms'] * (1 + tolerance)
+            if result['p95_ms'] > limit:
+                regressions.append(
+                    f'{name}: p95 {result["p95_ms"]:.1f} мс, '
+                    f'было {previous["p95_ms"]:.1f} мс'
+                )
+            if (result['queries'] is not None
+                    and previous.get('queries') is not None
+                    and result['queries'] > previous['queries']):
+                regressions.append(
+                    f'{name}: SQL-запросов {result["queries"]}, '
+                    f'было {previous["queries"]}'
+                )
+        return regressions
+
+    def handle(self, *args, **options):
+        user = self.get_user()
+        token, _ = Token.objects.get_or_create(user=user)
+        transport = (
+            HttpTransport(options['url'], token.key) if options['url']
+            else InProcessTransport(token.key)
+        )
+        scenarios = self.get_scenarios(user)
+        if options['only']:
+            unknown = set(options['only']) - {name for name, _ in scenarios}
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}'
+                )
+            scenarios = [
+                (name, steps) for name, steps in scenarios
+                if name in options['only']
+            ]
+
+        dataset = self.get_dataset()
+        self.stdout.write(
+            ', '.join(f'{key}: {value}' for key, value in dataset.items())
+        )
+        self.stdout.write(
+            f'{"эндпоинт":<26}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"rps":>9}{"SQL":>6}'
+        )
+        results = {}
+        for name, steps in scenarios:
+            result = self.run_scenario(
+                transport, steps, options['requests'], options['warmup']
+            )
+            results[name] = result
+            queries = result['queries']
+            self.stdout.write(
+                f'{name:<26}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+                f'{result["p99_ms"]:>9.2f}{result["rps"]:>9.1f}'
+                f'{"-" if queries is None else queries:>6}'
+            )
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps({
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'mode': options['url'] or 'in-process',
+                'requests': options['requests'],
+                'dataset': dataset,
+                'results': results,
+            }, ensure_ascii=False, indent=2), encoding='utf-8')
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+        if options['baseline']:
+            baseline = json.loads(
+                Path(options['baseline']).read_text(encoding='utf-8')
+            )
+            if baseline.get('dataset') != dataset:
+                self.stdout.write(self.style.WARNING(
+                    'Размер данных отличается от базового прогона'
+                ))
+            regressions = self.find_regressions(
+                results, baseline['results'], options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Обнаружены регрессии:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
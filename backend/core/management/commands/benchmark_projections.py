@@ -0,0 +1,125 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.hosts import get_local_host
+from recipes.models import Recipe
+from recipes.projections import RecipeProjection
+from recipes.serializers import RecipeReadSerializer
+from users.projections import SubscriptionProjection, UserProjection
+from users.serializers import CustomUserListSerializer, SubscriptionSerializer
+from users.views import UserViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость проекций списков и '
+        'сериализаторов на страницах разного размера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-sizes', type=int, nargs='+', default=[6, 50, 200],
+            help='Размеры страниц; страница берётся срезом queryset, '
+                 'поэтому MAX_PAGE_SIZE на неё не действует'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз строить каждую страницу'
+        )
+        parser.add_argument(
+            '--recipes-limit', type=int, default=3,
+            help='recipes_limit для списка подписок'
+        )
+
+    def make_request(self, user, recipes_limit):
+        request = Request(APIRequestFactory().get(
+            '/api/', {'recipes_limit': recipes_limit},
+            HTTP_HOST=get_local_host()
+        ))
+        request.user = user
+        return request
+
+    def get_cases(self, user):
+        """(название, пользователь, сериализатор, проекция, queryset)."""
+        anonymous = AnonymousUser()
+        subscriptions = UserViewSet().get_subscriptions_queryset
+        return [
+            (
+                'Рецепты, аноним', anonymous, RecipeReadSerializer,
+                RecipeProjection(),
+                lambda request: Recipe.objects.for_read(
+                    request.user
+                ).order_by('name', 'id')
+            ),
+            (
+                'Рецепты, пользователь', user, RecipeReadSerializer,
+                RecipeProjection(),
+                lambda request: Recipe.objects.for_read(
+                    request.user
+                ).order_by('name', 'id')
+            ),
+            (
+                'Пользователи', user, CustomUserListSerializer,
+                UserProjection(),
+                lambda request: User.objects.order_by('id')
+            ),
+            (
+                'Подписки', user, SubscriptionSerializer,
+                SubscriptionProjection(), subscriptions
+            ),
+        ]
+
+    def measure(self, build, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            build()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
+
+    def handle(self, *args, **options):
+        user = User.objects.annotate(
+            subscriptions_total=Count('subscriptions')
+        ).order_by('-subscriptions_total', 'id').first()
+        if user is None or not Recipe.objects.exists():
+            raise CommandError(
+                'База пуста: заполните её командой generate_load_data'
+            )
+        recipes_limit = options['recipes_limit']
+        for title, case_user, serializer_class, projection, get_queryset in (
+            self.get_cases(user)
+        ):
+            for size in options['page_sizes']:
+                def serialize():
+                    request = self.make_request(case_user, recipes_limit)
+                    page = list(get_queryset(request)[:size])
+                    return serializer_class(
+                        page, many=True, context={'request': request}
+                    ).data
+
+                def project():
+                    request = self.make_request(case_user, recipes_limit)
+                    rows = projection.prepare(get_queryset(request))
+                    return projection.render(list(rows[:size]), request)
+
+                if serialize() != project():
+                    raise CommandError(
+                        f'{title}, {size}: проекция расходится '
+                        'с сериализатором (см. core/tests/test_projections.py)'
+                    )
+                serializer_ms = self.measure(serialize, options['repeat'])
+                projection_ms = self.measure(project, options['repeat'])
+                self.stdout.write(
+                    f'{title}, {size}: сериализатор {serializer_ms:.2f} мс, '
+                    f'проекция {projection_ms:.2f} мс '
+                    f'(x{serializer_ms / projection_ms:.1f})'
+                )
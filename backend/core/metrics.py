@@ -0,0 +1,118 @@
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Histogram, generate_latest)
+from prometheus_client.multiprocess import MultiProcessCollector
+from rest_framework.response import Response
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+LABELS = ('view', 'method')
+# Каталог, через который процессы gunicorn делят метрики
+# (см. entrypoint.sh); без него метрики живут в памяти процесса
+MULTIPROCESS_DIR_VARIABLE = 'PROMETHEUS_MULTIPROC_DIR'
+
+HISTOGRAMS = (
+    Histogram(
+        'foodgram_request_duration_seconds', 'Время обработки запроса',
+        LABELS, buckets=DURATION_BUCKETS
+    ),
+    Histogram(
+        'foodgram_request_db_seconds', 'Время SQL-запросов за один запрос',
+        LABELS, buckets=DURATION_BUCKETS
+    ),
+    Histogram(
+        'foodgram_request_serialize_seconds',
+        'Время сериализации ответа без SQL-запросов',
+        LABELS, buckets=DURATION_BUCKETS
+    ),
+    Histogram(
+        'foodgram_request_render_seconds', 'Время отрисовки ответа',
+        LABELS, buckets=DURATION_BUCKETS
+    ),
+    Histogram(
+        'foodgram_request_queries', 'Число SQL-запросов за один запрос',
+        LABELS, buckets=QUERY_BUCKETS
+    ),
+)
+
+
+def observe(view, method, total, db, serialize, render, queries):
+    for histogram, value in zip(
+        HISTOGRAMS, (total, db, serialize, render, queries)
+    ):
+        histogram.labels(view, method).observe(value)
+
+
+def collect():
+    """
+    Метрики в текстовом формате Prometheus.
+
+    При нескольких процессах gunicorn prometheus_client пишет значения
+    в файлы каталога PROMETHEUS_MULTIPROC_DIR, и ответ суммирует их по
+    всем процессам, а не берёт тот, что обработал запрос /metrics/.
+    """
+    if MULTIPROCESS_DIR_VARIABLE not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+@contextmanager
+def measure_serialization(request):
+    """
+    Добавляет время блока к времени сериализации запроса.
+
+    SQL-запросы внутри блока уже учтены во времени базы и
+    не учитываются повторно.
+    """
+    metrics = getattr(request, 'metrics', None)
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    db_time = metrics.db_time
+    try:
+        yield
+    finally:
+        metrics.serialize_time += (
+            time.perf_counter() - started - (metrics.db_time - db_time)
+        )
+
+
+class SerializationMetricsMixin:
+    """Замер сериализации ответа retrieve для метрик запроса."""
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        with measure_serialization(request):
+            data = self.get_serializer(instance).data
+        return Response(data)
+
+
+def is_scraper(request):
+    """Метрики отдаются администраторам и по REQUEST_METRICS_TOKEN."""
+    if request.user.is_staff:
+        return True
+    token = settings.REQUEST_METRICS_TOKEN
+    return bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus."""
+    if not settings.REQUEST_METRICS_ENABLED:
+        raise Http404
+    if not is_scraper(request):
+        raise PermissionDenied
+    return HttpResponse(collect(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,119 @@
+import heapq
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.constants import SLOW_REQUEST_WORST_QUERIES
+from core.metrics import observe
+
+logger = logging.getLogger('core.metrics')
+
+
+class RequestMetrics:
+    """SQL-запросы и этапы обработки одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.worst = []
+        self.view_started = None
+        self.view_db_time = 0.0
+        self.view_time = None
+        self.serialize_time = 0.0
+        self.render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            item = (duration, self.queries, sql)
+            if len(self.worst) < SLOW_REQUEST_WORST_QUERIES:
+                heapq.heappush(self.worst, item)
+            else:
+                heapq.heappushpop(self.worst, item)
+
+
+class RequestMetricsMiddleware:
+    """Замеряет число и время SQL-запросов, работу представления,
+    сериализацию и отрисовку ответа.
+
+    Сериализацию отмечают сами представления через
+    core.metrics.measure_serialization. Добавляет заголовок
+    Server-Timing, пишет в журнал медленные запросы с самыми долгими
+    SQL-запросами и копит гистограммы по представлениям для
+    core.metrics. При REQUEST_METRICS_ENABLED = False Django исключает
+    middleware из цепочки целиком.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = settings.REQUEST_METRICS_SLOW_MS / 1000
+
+    def __call__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        finished = time.perf_counter()
+        total = finished - metrics.started
+        render = (
+            finished - metrics.render_started
+            if metrics.render_started is not None else 0.0
+        )
+        view = max(
+            (metrics.view_time or 0.0) - metrics.view_db_time
+            - metrics.serialize_time, 0
+        )
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.2f};'
+            f'desc="{metrics.queries} queries"',
+            f'view;dur={view * 1000:.2f}',
+            f'serialize;dur={metrics.serialize_time * 1000:.2f}',
+            f'render;dur={render * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+        match = request.resolver_match
+        observe(
+            match.view_name if match else 'unresolved', request.method,
+            total, metrics.db_time, metrics.serialize_time, render,
+            metrics.queries
+        )
+        if total >= self.slow_seconds:
+            self.log_slow_request(request, response, metrics, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics.view_started = time.perf_counter()
+        request.metrics.view_db_time = request.metrics.db_time
+
+    def process_template_response(self, request, response):
+        """Ответы DRF отрисовываются после выхода из представления."""
+        metrics = request.metrics
+        metrics.render_started = time.perf_counter()
+        if metrics.view_started is not None:
+            metrics.view_time = metrics.render_started - metrics.view_started
+            metrics.view_db_time = metrics.db_time - metrics.view_db_time
+        return response
+
+    def log_slow_request(self, request, response, metrics, total):
+        worst = '\n'.join(
+            f'  {duration * 1000:.1f} мс: {sql}'
+            for duration, _, sql in sorted(metrics.worst, reverse=True)
+        )
+        logger.warning(
+            'Медленный запрос %s %s: %d, %.1f мс, SQL: %d за %.1f мс\n%s',
+            request.method, request.get_full_path(), response.status_code,
+            total * 1000, metrics.queries, metrics.db_time * 1000, worst
+        )
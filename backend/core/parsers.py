@@ -0,0 +1,59 @@
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from core.renderers import FastJSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Целые вне 64 бит orjson читает как float с потерей точности
+LARGE_NUMBER = 2 ** 63
+
+
+def has_large_numbers(data):
+    """Есть ли в разобранных данных float, которым могло быть целое."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, float) and abs(value) >= LARGE_NUMBER:
+            return True
+    return False
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser на orjson.
+
+    orjson, как и DRF в строгом режиме, не принимает NaN и Infinity.
+    Тела, которые он не разобрал, и тела с числами за пределами 64 бит
+    повторно разбирает JSONParser, поэтому результат и текст ошибки совпадают
+    с DRF. Без orjson и для кодировок, отличных от UTF-8, работает как
+    обычный JSONParser.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if (
+            orjson is None or not self.strict
+            or encoding.lower().replace('-', '') != 'utf8'
+        ):
+            return super().parse(stream, media_type, parser_context)
+        data = stream.read()
+        try:
+            result = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            result = None
+        else:
+            if not has_large_numbers(result):
+                return result
+        return super().parse(io.BytesIO(data), media_type, parser_context)
@@ -0,0 +1,102 @@
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+from rest_framework.response import Response
+
+from core.metrics import measure_serialization
+
+
+class FileUrls:
+    """
+    Абсолютные URL файлов, как их отдают FileField и ImageField DRF.
+
+    Для FileSystemStorage адрес каталога строится через
+    build_absolute_uri один раз на запрос, а имя файла дописывается
+    к нему; для других хранилищ используется storage.url().
+    """
+
+    def __init__(self, request, storage):
+        self.request = request
+        self.storage = storage
+        self.base_url = None
+        if isinstance(storage, FileSystemStorage):
+            self.base_url = storage.base_url
+            if request is not None:
+                self.base_url = request.build_absolute_uri(self.base_url)
+
+    def __call__(self, name):
+        if not name:
+            return None
+        if self.base_url is not None:
+            return self.base_url + filepath_to_uri(name).lstrip('/')
+        url = self.storage.url(name)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+
+def file_urls(request, model, field):
+    return FileUrls(request, model._meta.get_field(field).storage)
+
+
+class Projection(ABC):
+    """
+    Сборка ответа списка из values() без сериализаторов.
+
+    prepare() превращает queryset представления в queryset словарей,
+    а render() строит из страницы этих словарей ровно те же данные,
+    что и сериализатор, которому проекция соответствует
+    (core/tests/test_projections.py сверяет их поле за полем).
+    """
+    fields = ()
+
+    def prepare(self, queryset):
+        """Оставляет в queryset только нужные поля и аннотации."""
+        return queryset.prefetch_related(None).values(
+            *self.fields, *queryset.query.annotations
+        )
+
+    @abstractmethod
+    def render(self, rows, request):
+        """Данные ответа для страницы строк prepare()."""
+
+
+class ProjectionListMixin:
+    """
+    Списки через проекцию вместо сериализатора.
+
+    Представление задаёт get_projection(); если проекции нет или
+    FAST_LIST_RENDERING выключен, страница сериализуется как обычно.
+    """
+
+    def get_projection(self):
+        return None
+
+    def render_list(self, queryset, paginator=None):
+        """Пагинирует queryset и отдаёт страницу проекцией."""
+        if paginator is None:
+            paginator = self.paginator
+        projection = None
+        if settings.FAST_LIST_RENDERING:
+            projection = self.get_projection()
+        if projection is not None:
+            queryset = projection.prepare(queryset)
+        page = None
+        if paginator is not None:
+            page = paginator.paginate_queryset(
+                queryset, self.request, view=self
+            )
+        rows = list(queryset) if page is None else page
+        with measure_serialization(self.request):
+            if projection is not None:
+                data = projection.render(rows, self.request)
+            else:
+                data = self.get_serializer(rows, many=True).data
+        if page is None:
+            return Response(data)
+        return paginator.get_paginated_response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.render_list(self.filter_queryset(self.get_queryset()))
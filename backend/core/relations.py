@@ -0,0 +1,178 @@
+from django.db import IntegrityError, connections, transaction
+
+
+def supports_returning(connection):
+    """Умеет ли СУБД INSERT ... ON CONFLICT и DELETE ... RETURNING."""
+    return (
+        connection.vendor in ('postgresql', 'sqlite')
+        and connection.features.can_return_rows_from_bulk_insert
+    )
+
+
+def create_link(model, target_field, target_id, fields=(), **values):
+    """
+    Создаёт связь model(**values, target_field=target_id), если её ещё нет.
+
+    Проверка цели, вставка и обнаружение дубля по уникальному
+    ограничению выполняются одним INSERT ... ON CONFLICT DO NOTHING,
+    поэтому одновременные одинаковые запросы не приводят к
+    IntegrityError. В PostgreSQL тем же запросом загружаются поля
+    fields объекта-цели.
+
+    Возвращает (цель, создана ли связь); цель — None, если объекта
+    target_id нет.
+    """
+    meta = model._meta
+    target_model = meta.get_field(target_field).related_model
+    connection = connections[model.objects.db]
+    if not supports_returning(connection):
+        return _create_link_fallback(
+            model, target_field, target_id, fields, values
+        )
+
+    quote = connection.ops.quote_name
+    target_pk = quote(target_model._meta.pk.column)
+    columns = ', '.join(
+        quote(meta.get_field(name).column)
+        for name in (*values, target_field)
+    )
+    placeholders = ', '.join(['%s'] * len(values))
+    insert = (
+        f'INSERT INTO {quote(meta.db_table)} ({columns}) '
+        f'SELECT {placeholders}, {target_pk} FROM {{source}} '
+        f'WHERE {target_pk} = %s ON CONFLICT DO NOTHING RETURNING 1'
+    )
+    params = [*values.values(), target_id]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            selected_fields = [target_model._meta.pk] + [
+                target_model._meta.get_field(name) for name in fields
+            ]
+            selected = ', '.join(
+                quote(field.column) for field in selected_fields
+            )
+            cursor.execute(
+                f'WITH target AS (SELECT {selected} '
+                f'FROM {quote(target_model._meta.db_table)} '
+                f'WHERE {target_pk} = %s), '
+                f'inserted AS ({insert.format(source="target")}) '
+                f'SELECT (SELECT count(*) FROM inserted), {selected} '
+                f'FROM target',
+                [target_id, *params]
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None, False
+            return target_model.from_db(
+                model.objects.db,
+                [field.attname for field in selected_fields],
+                row[1:]
+            ), bool(row[0])
+        cursor.execute(
+            insert.format(source=quote(target_model._meta.db_table)),
+            params
+        )
+        created = cursor.fetchone() is not None
+    if created and not fields:
+        return target_model(pk=target_id), True
+    target = target_model._base_manager.using(model.objects.db).only(
+        *fields
+    ).filter(pk=target_id).first()
+    return target, created
+
+
+def _create_link_fallback(model, target_field, target_id, fields, values):
+    """Для СУБД без ON CONFLICT ... RETURNING: вставка в точке
+    сохранения и разбор IntegrityError."""
+    target_model = model._meta.get_field(target_field).related_model
+    target = target_model._base_manager.only(*fields).filter(
+        pk=target_id
+    ).first()
+    if target is None:
+        return None, False
+    try:
+        with transaction.atomic():
+            model.objects.create(**values, **{target_field: target})
+    except IntegrityError:
+        return target, False
+    return target, True
+
+
+def create_links(model, target_field, target_ids, **values):
+    """
+    Создаёт связи model(**values, target_field=id) с существующими
+    объектами из target_ids.
+
+    Всё делает один INSERT ... SELECT ... ON CONFLICT DO NOTHING
+    RETURNING: он возвращает только строки, вставленные им самим, так
+    что связь, которую успел создать одновременный запрос, не считается
+    созданной. Возвращает множество id целей, связи с которыми созданы.
+    """
+    target_ids = list(target_ids)
+    connection = connections[model.objects.db]
+    if not target_ids:
+        return set()
+    if not supports_returning(connection):
+        return {
+            target_id for target_id in target_ids
+            if _create_link_fallback(
+                model, target_field, target_id, (), values
+            )[1]
+        }
+    meta = model._meta
+    target_model = meta.get_field(target_field).related_model
+    quote = connection.ops.quote_name
+    target_pk = quote(target_model._meta.pk.column)
+    columns = ', '.join(
+        quote(meta.get_field(name).column)
+        for name in (*values, target_field)
+    )
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(meta.db_table)} ({columns}) '
+            f'SELECT {placeholders}, {target_pk} '
+            f'FROM {quote(target_model._meta.db_table)} '
+            f'WHERE {target_pk} IN ({", ".join(["%s"] * len(target_ids))}) '
+            f'ON CONFLICT DO NOTHING '
+            f'RETURNING {quote(meta.get_field(target_field).column)}',
+            [*values.values(), *target_ids]
+        )
+        return {target_id for target_id, in cursor.fetchall()}
+
+
+def delete_links(model, target_field, target_ids, **values):
+    """
+    Удаляет связи model(**values, target_field=id) одним
+    DELETE ... RETURNING.
+
+    Возвращает множество id целей, связи с которыми удалил именно этот
+    запрос: связь, удалённая одновременным запросом, в него не попадёт.
+    """
+    target_ids = list(target_ids)
+    connection = connections[model.objects.db]
+    if not target_ids:
+        return set()
+    if not supports_returning(connection):
+        return {
+            target_id for target_id in target_ids
+            if model.objects.filter(
+                **values, **{target_field: target_id}
+            ).delete()[0]
+        }
+    meta = model._meta
+    quote = connection.ops.quote_name
+    target_column = quote(meta.get_field(target_field).column)
+    conditions = ' AND '.join(
+        f'{quote(meta.get_field(name).column)} = %s' for name in values
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} WHERE {conditions} '
+            f'AND {target_column} IN '
+            f'({", ".join(["%s"] * len(target_ids))}) '
+            f'RETURNING {target_column}',
+            [*values.values(), *target_ids]
+        )
+        return {target_id for target_id, in cursor.fetchall()}
@@ -0,0 +1,188 @@
+import hashlib
+import time
+import uuid
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from core.constants import (RESPONSE_CACHE_LOCK_TIMEOUT, RESPONSE_CACHE_TTL,
+                            RESPONSE_CACHE_WAIT_ATTEMPTS,
+                            RESPONSE_CACHE_WAIT_INTERVAL)
+
+KEY_PREFIX = 'response-cache'
+# Заголовки, которые сохраняются вместе с данными ответа
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+
+def generation_key(name):
+    return f'{KEY_PREFIX}:generation:{name}'
+
+
+def get_generations(names):
+    """
+    Текущие поколения областей кэша одним обращением к кэшу.
+
+    Ключи ответов включают поколения, поэтому смена поколения делает
+    все ответы области недоступными без их перебора.
+    """
+    keys = [generation_key(name) for name in names]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump(names):
+    cache.set_many(
+        {generation_key(name): uuid.uuid4().hex for name in names},
+        timeout=None
+    )
+
+
+def is_shared_cache():
+    """
+    Общий ли кэш у всех процессов.
+
+    У LocMemCache (по умолчанию) кэш свой у каждого воркера gunicorn,
+    и invalidate() доходит только до процесса, изменившего данные:
+    остальные отдавали бы устаревшие ответы до конца
+    RESPONSE_CACHE_TTL. На таком кэше ответы не кэшируются.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def invalidate(*names):
+    """
+    Сбрасывает области кэша после фиксации текущей транзакции.
+
+    До фиксации другие запросы ещё видят старые данные и могли бы
+    снова сохранить их под новым поколением.
+    """
+    names = set(names)
+    transaction.on_commit(lambda: bump(names))
+
+
+class ResponseCacheMixin:
+    """
+    Кэш ответов list и retrieve для анонимных запросов.
+
+    Работает только с общим для процессов кэшем (CACHE_URL, например
+    redis://), см. is_shared_cache.
+    Ключ строится из схемы и хоста запроса (в данных ответа абсолютные
+    URL картинок и страниц), действия, объекта, нормализованных
+    параметров запроса и поколений областей из get_cache_generations;
+    сбрасываются области через invalidate() из обработчиков сигналов моделей.
+    Ответ вычисляет только запрос, взявший блокировку ключа
+    (cache.add), остальные ждут его результата, а не идут в базу;
+    у файлового бэкенда add не атомарен, и изредка ответ вычисляют
+    два запроса.
+    Сохраняются данные ответа и валидаторы, поэтому на попадание
+    отвечает и 304 Not Modified.
+    """
+
+    def get_cache_generations(self, request):
+        """Имена областей кэша, от которых зависит ответ."""
+        return [self.basename]
+
+    def get_cache_params(self, request):
+        """
+        Параметры запроса без учёта порядка имён.
+
+        Пропускаются только пустые фильтры: django-filter их
+        не применяет. Остальные пустые параметры меняют ответ
+        (?cursor= включает keyset-пагинацию) и остаются в ключе.
+        Порядок значений одного параметра сохраняется: одиночный
+        фильтр берёт последнее.
+        """
+        filters = getattr(self.filterset_class, 'base_filters', {})
+        return sorted(
+            (name, values)
+            for name, values in request.query_params.lists()
+            if name not in filters or any(values)
+        )
+
+    def get_cache_key(self, request):
+        digest = hashlib.md5(repr((
+            request.scheme,
+            request.get_host(),
+            self.get_cache_params(request),
+            get_generations(self.get_cache_generations(request))
+        )).encode(), usedforsecurity=False).hexdigest()
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+        return f'{KEY_PREFIX}:{self.basename}:{self.action}:{pk}:{digest}'
+
+    def wait_for_entry(self, key, lock):
+        """
+        Ждёт ответа, который вычисляет другой запрос.
+
+        Ожидание прекращается раньше, если блокировка снята без
+        результата (например, ответ оказался не 200).
+        """
+        for _ in range(RESPONSE_CACHE_WAIT_ATTEMPTS):
+            time.sleep(RESPONSE_CACHE_WAIT_INTERVAL)
+            values = cache.get_many([key, lock])
+            if key in values or lock not in values:
+                return values.get(key)
+        return None
+
+    def compute_entry(self, request, key, handler, *args, **kwargs):
+        """Вычисляет ответ и сохраняет его, если он успешный."""
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200 and isinstance(response, Response):
+            cache.set(key, {
+                'data': response.data,
+                'headers': {
+                    name: response[name] for name in CACHED_HEADERS
+                    if response.has_header(name)
+                },
+            }, RESPONSE_CACHE_TTL)
+        return response
+
+    def response_from_entry(self, request, entry):
+        headers = entry['headers']
+        response = get_conditional_response(
+            request,
+            etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(
+                headers.get('Last-Modified', '')
+            )
+        )
+        if response is None:
+            response = Response(entry['data'])
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if request.user.is_authenticated or not is_shared_cache():
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            return self.response_from_entry(request, entry)
+        lock = f'{key}:lock'
+        if cache.add(lock, 1, RESPONSE_CACHE_LOCK_TIMEOUT):
+            try:
+                return self.compute_entry(
+                    request, key, handler, *args, **kwargs
+                )
+            finally:
+                cache.delete(lock)
+        entry = self.wait_for_entry(key, lock)
+        if entry is not None:
+            return self.response_from_entry(request, entry)
+        return handler(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
@@ -1,6 +1,12 @@
 import string
 
 BASE62_ALPHABET = string.digits + string.ascii_letters
+# Символ -> его значение; заменяет поиск по алфавиту при декодировании
+BASE62_DECODE_TABLE = {
+    char: index for index, char in enumerate(BASE62_ALPHABET)
+}
+# Код длиннее не нужен ни одному id из BigAutoField (62 ** 11 > 2 ** 63)
+BASE62_MAX_LENGTH = 11
 
 
 def encode_base62(num):
@@ -14,7 +20,14 @@ def encode_base62(num):
 
 
 def decode_base62(code):
+    """Число по коду; ValueError для пустого, слишком длинного кода
+    или кода с посторонними символами."""
+    if not code or len(code) > BASE62_MAX_LENGTH:
+        raise ValueError(f'Некорректный код: {code!r}')
     num = 0
-    for char in code:
-        num = num * 62 + BASE62_ALPHABET.index(char)
+    try:
+        for char in code:
+            num = num * 62 + BASE62_DECODE_TABLE[char]
+    except KeyError:
+        raise ValueError(f'Некорректный код: {code!r}')
     return num
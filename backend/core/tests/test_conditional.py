@@ -0,0 +1,48 @@
+from django.test import RequestFactory, SimpleTestCase
+
+from core.conditional import choose_encoding, prerendered_response
+
+ENCODINGS = {'br': b'br-body', 'gzip': b'gzip-body'}
+
+
+class ChooseEncodingTests(SimpleTestCase):
+    """Выбор сжатого варианта по Accept-Encoding с учётом q."""
+
+    def choose(self, header, encodings=ENCODINGS):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=header)
+        return choose_encoding(request, encodings)
+
+    def test_choice(self):
+        cases = (
+            ('', None),
+            ('gzip', 'gzip'),
+            ('gzip, deflate, br', 'br'),
+            ('GZIP', 'gzip'),
+            ('deflate', None),
+            ('gzip;q=0', None),
+            ('gzip; q=0.000', None),
+            ('br;q=0, gzip', 'gzip'),
+            ('br;q=0.5, gzip;q=0.8', 'gzip'),
+            ('br;q=0.8, gzip;q=0.8', 'br'),
+            ('gzip;q=abc', None),
+            ('*', 'br'),
+            ('*;q=0', None),
+            ('*, br;q=0', 'gzip'),
+            ('gzip;q=0.5, identity', None),
+            ('gzip, identity;q=0.5', 'gzip'),
+        )
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(self.choose(header), expected)
+
+    def test_only_prepared_variants_are_chosen(self):
+        self.assertEqual(self.choose('br, gzip', {'gzip': b''}), 'gzip')
+        self.assertIsNone(self.choose('br', {'gzip': b''}))
+
+    def test_refused_encoding_gets_plain_body(self):
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING='gzip;q=0'
+        )
+        response = prerendered_response(request, b'plain', 'd', ENCODINGS)
+        self.assertEqual(response.content, b'plain')
+        self.assertFalse(response.has_header('Content-Encoding'))
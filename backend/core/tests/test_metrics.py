@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+
+from recipes.models import Ingredient
+
+User = get_user_model()
+
+
+@override_settings(
+    REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_TOKEN='secret'
+)
+class MetricsViewTests(TestCase):
+    """Доступ к /metrics/ и заголовок Server-Timing."""
+
+    def test_anonymous_request_is_forbidden(self):
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_wrong_token_is_forbidden(self):
+        response = self.client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer wrong'
+        )
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(REQUEST_METRICS_TOKEN='')
+    def test_empty_token_setting_does_not_open_metrics(self):
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 403)
+
+    def test_token_and_staff_are_allowed(self):
+        response = self.client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        staff = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x',
+            is_staff=True
+        )
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/metrics/').status_code, 200)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled_metrics_are_not_found(self):
+        response = self.client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_serialization_is_reported_and_exported(self):
+        ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+        response = Client().get(f'/api/ingredients/{ingredient.pk}/')
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        metrics = self.client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+        ).content.decode()
+        self.assertIn(
+            'foodgram_request_serialize_seconds_count'
+            '{method="GET",view="ingredients-detail"}',
+            metrics
+        )
@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.projections import RecipeProjection
+from recipes.serializers import RecipeReadSerializer
+from users.models import Subscription
+from users.projections import SubscriptionProjection, UserProjection
+from users.serializers import CustomUserListSerializer, SubscriptionSerializer
+from users.views import UserViewSet
+
+User = get_user_model()
+
+
+class ProjectionParityTests(APITestCase):
+    """Проекции списков отдают то же, что и их сериализаторы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author, cls.plain = (
+            User.objects.create_user(
+                username=username, email=f'{username}@example.com',
+                password='x', first_name=username.title(),
+                last_name='Тестов', avatar=avatar
+            )
+            for username, avatar in (
+                ('reader', None),
+                ('author', 'users/avatars/author.png'),
+                ('plain', ''),
+            )
+        )
+        salt, sugar = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Соль', 'Сахар')
+        )
+        recipes = [
+            Recipe.objects.create(
+                author=author, name=name, text='Текст',
+                image=image, cooking_time=cooking_time
+            )
+            for author, name, image, cooking_time in (
+                (cls.author, 'Борщ', 'recipes/images/borsch.png', 90),
+                (cls.author, 'Вареники', '', 40),
+                (cls.author, 'Блины', 'recipes/images/bliny.png', 30),
+                (cls.plain, 'Каша', '', 15),
+                (cls.reader, 'Омлет', 'recipes/images/omelet.png', 10),
+            )
+        ]
+        for recipe in recipes[:3]:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=salt, amount=5
+            )
+        RecipeIngredient.objects.create(
+            recipe=recipes[0], ingredient=sugar, amount=20
+        )
+        for user, count in ((cls.author, 3), (cls.plain, 1), (cls.reader, 1)):
+            User.objects.filter(pk=user.pk).update(recipes_count=count)
+        cls.reader.favorites.create(recipe=recipes[0])
+        cls.reader.shopping_carts.create(recipe=recipes[1])
+        for author in (cls.author, cls.plain):
+            Subscription.objects.create(user=cls.reader, author=author)
+
+    def make_request(self, user, **params):
+        request = Request(APIRequestFactory().get('/api/', params))
+        request.user = user
+        return request
+
+    def assert_parity(self, serializer_class, projection, queryset, request):
+        expected = serializer_class(
+            list(queryset), many=True, context={'request': request}
+        ).data
+        rows = list(projection.prepare(queryset))
+        self.assertTrue(rows)
+        self.assertEqual(projection.render(rows, request), expected)
+
+    def test_recipes(self):
+        for user in (AnonymousUser(), self.reader, self.plain):
+            with self.subTest(user=user):
+                request = self.make_request(user)
+                self.assert_parity(
+                    RecipeReadSerializer, RecipeProjection(),
+                    Recipe.objects.for_read(user).order_by('name', 'id'),
+                    request
+                )
+
+    def test_users(self):
+        for user in (AnonymousUser(), self.reader):
+            with self.subTest(user=user):
+                self.assert_parity(
+                    CustomUserListSerializer, UserProjection(),
+                    User.objects.order_by('-id'), self.make_request(user)
+                )
+
+    def test_subscriptions(self):
+        for params in ({}, {'recipes_limit': 0}, {'recipes_limit': 2},
+                       {'recipes_limit': 'all'}):
+            with self.subTest(params=params):
+                request = self.make_request(self.reader, **params)
+                self.assert_parity(
+                    SubscriptionSerializer, SubscriptionProjection(),
+                    UserViewSet().get_subscriptions_queryset(request),
+                    request
+                )
+
+    def test_endpoints_match_serializers(self):
+        self.client.force_authenticate(self.reader)
+        for url in ('/api/recipes/', '/api/users/',
+                    '/api/users/subscriptions/?recipes_limit=1'):
+            with self.subTest(url=url):
+                with override_settings(FAST_LIST_RENDERING=False):
+                    expected = self.client.get(url).json()
+                with override_settings(FAST_LIST_RENDERING=True):
+                    self.assertEqual(self.client.get(url).json(), expected)
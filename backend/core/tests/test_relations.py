@@ -0,0 +1,238 @@
+import logging
+import threading
+from collections import Counter
+from contextlib import ExitStack
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient, APITestCase
+
+from core import relations
+from core.relations import create_link, create_links, delete_links
+from recipes import views
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+URL_NAMES = {Favorite: 'favorite', ShoppingCart: 'shopping_cart'}
+
+
+class BulkRelationTests(APITestCase):
+    """Пакетное избранное и корзина считают только свои изменения."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='x'
+        )
+        cls.first, cls.second = (
+            Recipe.objects.create(
+                author=cls.user, name=name, text='Текст',
+                image='recipes/images/test.png', cooking_time=5
+            )
+            for name in ('Первый', 'Второй')
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def bulk(self, method, model, recipe_ids):
+        response = getattr(self.client, method)(
+            f'/api/recipes/{URL_NAMES[model]}/bulk/',
+            {'recipes': recipe_ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return {
+            item['id']: item['status'] for item in response.data['results']
+        }
+
+    def assert_counters(self, field, model):
+        for recipe in (self.first, self.second):
+            recipe.refresh_from_db()
+            self.assertEqual(
+                getattr(recipe, field),
+                model.objects.filter(recipe=recipe).count()
+            )
+
+    def test_links_report_only_their_own_rows(self):
+        Favorite.objects.create(user=self.user, recipe=self.first)
+        ids = [self.first.pk, self.second.pk]
+        self.assertEqual(
+            create_links(Favorite, 'recipe', ids, user_id=self.user.pk),
+            {self.second.pk}
+        )
+        self.assertEqual(
+            create_links(Favorite, 'recipe', ids, user_id=self.user.pk),
+            set()
+        )
+        self.assertEqual(
+            delete_links(Favorite, 'recipe', ids, user_id=self.user.pk),
+            set(ids)
+        )
+        self.assertEqual(
+            delete_links(Favorite, 'recipe', ids, user_id=self.user.pk),
+            set()
+        )
+
+    def test_concurrent_single_add_is_not_counted_twice(self):
+        """Одиночное добавление, успевшее между проверкой рецептов и
+        вставкой, остаётся за одиночным запросом."""
+        missing = self.second.pk + 1000
+        for model in (Favorite, ShoppingCart):
+            with self.subTest(model=model.__name__):
+                single_url = (
+                    f'/api/recipes/{self.first.pk}/{URL_NAMES[model]}/'
+                )
+                real_create_links = views.create_links
+
+                def racing_create_links(*args, **kwargs):
+                    response = self.client.post(single_url)
+                    self.assertEqual(response.status_code, 201)
+                    return real_create_links(*args, **kwargs)
+
+                with mock.patch.object(
+                    views, 'create_links', racing_create_links
+                ):
+                    statuses = self.bulk(
+                        'post', model, [self.first.pk, self.second.pk, missing]
+                    )
+                self.assertEqual(statuses, {
+                    self.first.pk: 'exists',
+                    self.second.pk: 'added',
+                    missing: 'not_found',
+                })
+                self.assert_counters(model.recipe_counter, model)
+
+    def test_remove_reports_removed_and_absent(self):
+        self.bulk('post', ShoppingCart, [self.first.pk])
+        statuses = self.bulk(
+            'delete', ShoppingCart, [self.first.pk, self.second.pk]
+        )
+        self.assertEqual(statuses, {
+            self.first.pk: 'removed', self.second.pk: 'absent'
+        })
+        self.assert_counters('in_carts_count', ShoppingCart)
+
+
+class CreateLinkTests(TransactionTestCase):
+    """
+    create_link в SQLite и PostgreSQL и одновременные запросы к нему.
+
+    Тесты с потоками пропускаются для SQLite в памяти: там соединения
+    не ждут блокировок, а сразу получают ошибку. Их запускает
+    DB_TEST_NAME=test.sqlite3 или PostgreSQL.
+    """
+    threads = 8
+
+    def setUp(self):
+        self.user, self.author = (
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com', password='x'
+            )
+            for name in ('user', 'author')
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Текст',
+            image='recipes/images/test.png', cooking_time=5
+        )
+
+    def link(self, target_id, fields=()):
+        return create_link(
+            Favorite, 'recipe', target_id, fields=fields,
+            user_id=self.user.pk
+        )
+
+    def assert_creates_once(self, queries=None):
+        """Первая связь создаётся (за queries запросов, если задано),
+        повторная — нет, для несуществующей цели возвращается None."""
+        with ExitStack() as stack:
+            if queries is not None:
+                stack.enter_context(self.assertNumQueries(queries))
+            recipe, created = self.link(self.recipe.pk, fields=('name',))
+        self.assertTrue(created)
+        self.assertEqual(recipe.name, self.recipe.name)
+        recipe, created = self.link(self.recipe.pk, fields=('name',))
+        self.assertFalse(created)
+        self.assertEqual(recipe.name, self.recipe.name)
+        self.assertEqual(self.link(self.recipe.pk + 1000), (None, False))
+        self.assertEqual(Favorite.objects.count(), 1)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Путь SQLite')
+    def test_sqlite_inserts_then_loads_fields(self):
+        self.assert_creates_once(queries=2)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Путь PostgreSQL')
+    def test_postgresql_inserts_and_loads_fields_in_one_query(self):
+        self.assert_creates_once(queries=1)
+
+    def test_fallback_without_returning(self):
+        with mock.patch.object(
+            relations, 'supports_returning', return_value=False
+        ):
+            self.assert_creates_once()
+
+    def hammer(self, method, path):
+        """Отправляет threads одинаковых запросов одновременно."""
+        barrier = threading.Barrier(self.threads)
+        statuses = Counter()
+        lock = threading.Lock()
+
+        def worker():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            barrier.wait()
+            try:
+                status = getattr(client, method)(path).status_code
+            finally:
+                connection.close()
+            with lock:
+                statuses[status] += 1
+
+        workers = [
+            threading.Thread(target=worker) for _ in range(self.threads)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return statuses
+
+    def test_concurrent_requests_change_data_once(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite в памяти не ждёт блокировок')
+        # 400 здесь ожидаемы, не засоряем ими вывод
+        logger = logging.getLogger('django.request')
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.ERROR)
+        cases = (
+            (f'/api/recipes/{self.recipe.pk}/favorite/', Favorite),
+            (f'/api/recipes/{self.recipe.pk}/shopping_cart/', ShoppingCart),
+            (f'/api/users/{self.author.pk}/subscribe/', Subscription),
+        )
+        for path, model in cases:
+            with self.subTest(path=path):
+                for method, success in (('post', 201), ('delete', 204)):
+                    self.assertEqual(
+                        self.hammer(method, path),
+                        Counter({success: 1, 400: self.threads - 1})
+                    )
+                    self.assertEqual(
+                        model.objects.filter(user=self.user).count(),
+                        int(method == 'post')
+                    )
+                    self.recipe.refresh_from_db()
+                    self.author.refresh_from_db()
+                    self.assertEqual(
+                        (
+                            self.recipe.favorites_count,
+                            self.recipe.in_carts_count,
+                            self.author.subscribers_count,
+                        ),
+                        (
+                            self.recipe.favorites.count(),
+                            self.recipe.shopping_carts.count(),
+                            self.author.subscribers.count(),
+                        )
+                    )
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from core.checks import check_shared_cache
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class ResponseCacheTests(APITestCase):
+    """Кэш анонимных ответов списка рецептов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        location = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, location)
+        shared = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }})
+        shared.enable()
+        cls.addClassCleanup(shared.disable)
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='x'
+        )
+        for name in ('Борщ', 'Суп'):
+            Recipe.objects.create(
+                author=author, name=name, text='Текст',
+                image='recipes/images/test.png', cooking_time=5
+            )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='x'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def test_repeated_request_is_served_from_cache(self):
+        data, _ = self.get('/api/recipes/')
+        self.assertEqual(self.get('/api/recipes/'), (data, 0))
+
+    def test_empty_cursor_is_part_of_the_key(self):
+        for first, second in (
+            ('/api/recipes/?cursor=', '/api/recipes/'),
+            ('/api/recipes/', '/api/recipes/?cursor='),
+        ):
+            with self.subTest(first=first):
+                cache.clear()
+                self.get(first)
+                keyset, _ = self.get('/api/recipes/?cursor=')
+                pages, _ = self.get('/api/recipes/')
+                self.assertNotIn('count', keyset)
+                self.assertEqual(pages['count'], 2)
+
+    def test_empty_filter_shares_the_key(self):
+        data, _ = self.get('/api/recipes/')
+        self.assertEqual(self.get('/api/recipes/?author='), (data, 0))
+
+    def test_value_order_is_part_of_the_key(self):
+        """Одиночный фильтр берёт последнее значение параметра."""
+        reader = self.reader.pk
+        data, _ = self.get(f'/api/recipes/?author={reader}&author=')
+        self.assertEqual(data['count'], 2)
+        data, queries = self.get(f'/api/recipes/?author=&author={reader}')
+        self.assertNotEqual(queries, 0)
+        self.assertEqual(data['count'], 0)
+
+    @override_settings(ALLOWED_HOSTS=['a.example', 'b.example'])
+    def test_host_and_scheme_are_part_of_the_key(self):
+        url = '/api/recipes/?limit=1'
+        links = set()
+        for host, secure in (
+            ('a.example', False), ('b.example', False), ('b.example', True)
+        ):
+            with self.subTest(host=host, secure=secure):
+                response = self.client.get(url, HTTP_HOST=host, secure=secure)
+                self.assertEqual(response.status_code, 200)
+                scheme = 'https' if secure else 'http'
+                prefix = f'{scheme}://{host}/'
+                self.assertTrue(response.data['next'].startswith(prefix))
+                image = response.data['results'][0]['image']
+                self.assertTrue(image.startswith(prefix))
+                links.add(response.data['next'])
+        self.assertEqual(len(links), 3)
+
+    def test_process_local_cache_is_not_used(self):
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            self.get('/api/recipes/')
+            _, queries = self.get('/api/recipes/')
+            self.assertNotEqual(queries, 0)
+            self.assertEqual(
+                [warning.id for warning in check_shared_cache(None)],
+                ['core.W001']
+            )
+        self.assertEqual(check_shared_cache(None), [])
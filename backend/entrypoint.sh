@@ -10,6 +10,12 @@ python manage.py import_ingredients
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+echo "Preparing metrics directory..."
+# Воркеры gunicorn пишут метрики в общий каталог, /metrics/ суммирует их
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 echo "Starting Gunicorn server..."
 exec gunicorn foodgram.wsgi:application \
     --bind 0.0.0.0:8000 \
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,13 +76,37 @@ DATABASES = {
         'PASSWORD': env('POSTGRES_PASSWORD', default='foodgram_pass'),
         'HOST': env('DB_HOST', default='db'),
         'PORT': env('DB_PORT', default='5432'),
+        # SQLite по умолчанию тестируется в памяти, где одновременные
+        # соединения не ждут блокировок; для тестов конкурентности
+        # нужен файл
+        'TEST': {'NAME': env('DB_TEST_NAME', default=None)},
     }
 }
 
+# Cache
+# Например, redis://cache:6379/0 (см. infra/docker-compose.yml);
+# по умолчанию — память процесса, и кэш ответов API тогда выключен
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Метрики запросов: Server-Timing, журнал медленных запросов, /metrics/
+
+REQUEST_METRICS_ENABLED = env.bool('REQUEST_METRICS_ENABLED', default=False)
+REQUEST_METRICS_SLOW_MS = env.int('REQUEST_METRICS_SLOW_MS', default=500)
+# /metrics/ отдаётся администраторам и запросам с заголовком
+# Authorization: Bearer <REQUEST_METRICS_TOKEN>
+REQUEST_METRICS_TOKEN = env('REQUEST_METRICS_TOKEN', default='')
+
+# Списки рецептов и пользователей собираются из values() без
+# сериализаторов (core.projections)
+
+FAST_LIST_RENDERING = env.bool('FAST_LIST_RENDERING', default=True)
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -134,6 +159,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'core.pagination.LimitPageNumberPagination',
     'PAGE_SIZE': PAGE_SIZE,
     'DEFAULT_FILTER_BACKENDS': [
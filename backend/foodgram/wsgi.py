@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
+import logging
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,18 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
 application = get_wsgi_application()
+
+# Прогреваем индексы ингредиентов в каждом воркере
+try:
+    from django.db import DatabaseError
+
+    from recipes.ingredient_index import ingredient_index
+    from recipes.recipe_index import recipe_index
+
+    ingredient_index.build()
+    recipe_index.build()
+except DatabaseError:
+    logging.getLogger(__name__).warning(
+        'Индексы рецептов и ингредиентов не прогреты: воркер построит их '
+        'при первом запросе', exc_info=True
+    )
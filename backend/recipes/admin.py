@@ -1,8 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
-from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart)
+from .models import (Favorite, FeedEntry, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingListItem)
 
 User = get_user_model()
 
@@ -21,6 +21,20 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_filter = ('user',)
 
 
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'total')
+    search_fields = ('user__username', 'ingredient__name')
+    list_filter = ('user',)
+
+
+@admin.register(FeedEntry)
+class FeedEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'recipe', 'author')
+    search_fields = ('user__username', 'recipe__name')
+    list_select_related = ('user', 'recipe', 'author')
+
+
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
@@ -38,15 +52,14 @@ class RecipeIngredientInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorites_count')
+    list_display = (
+        'name', 'author', 'favorites_count', 'in_carts_count',
+        'short_link_hits'
+    )
     search_fields = ('name', 'author__username', 'author__email')
     list_filter = ('author', 'name')
     inlines = [RecipeIngredientInline]
 
-    @admin.display(description='В избранном раз')
-    def favorites_count(self, obj):
-        return obj.favorites.count()
-
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
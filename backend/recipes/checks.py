@@ -0,0 +1,56 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+
+from recipes.search import FTS_TABLE, RECIPE_TABLE, SQLITE_TRIGGERS
+
+SEARCH_INDEX_MIGRATION = ('recipes', '0018_recipe_search_index')
+
+
+def get_missing_search_objects(connection):
+    """
+    Таблица и триггеры FTS5, которых нет в базе SQLite.
+
+    Пока миграция индекса не применена, отсутствие не считается ошибкой.
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    recorder = MigrationRecorder(connection)
+    if not recorder.has_table() or (
+        SEARCH_INDEX_MIGRATION not in recorder.applied_migrations()
+    ):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE (type = 'trigger' AND tbl_name = %s) "
+            "OR (type = 'table' AND name = %s)",
+            (RECIPE_TABLE, FTS_TABLE)
+        )
+        existing = {name for name, in cursor.fetchall()}
+    return [
+        name for name in (FTS_TABLE, *SQLITE_TRIGGERS)
+        if name not in existing
+    ]
+
+
+@register(Tags.database)
+def check_search_index(app_configs, databases=None, **kwargs):
+    """
+    Поиск в SQLite держится на триггерах таблицы рецептов, а миграции,
+    пересоздающие таблицу, удаляют их без предупреждения.
+    """
+    warnings = []
+    for alias in databases or ():
+        missing = get_missing_search_objects(connections[alias])
+        if missing:
+            warnings.append(Warning(
+                f'В базе {alias} нет объектов поиска рецептов: '
+                f'{", ".join(missing)}. Поиск и его индекс расходятся '
+                'с таблицей рецептов.',
+                hint='Выполните python manage.py rebuild_search_index и '
+                     'добавьте восстановление индекса в миграцию, '
+                     'пересоздавшую таблицу (см. 0019).',
+                id='recipes.W001',
+            ))
+    return warnings
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Subscription
+
+from .models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+# Денормализованные счётчики: модель -> {поле: (модель связи, поле FK)}
+COUNTERS = {
+    Recipe: {
+        'favorites_count': (Favorite, 'recipe'),
+        'in_carts_count': (ShoppingCart, 'recipe'),
+    },
+    User: {
+        'recipes_count': (Recipe, 'author'),
+        'subscribers_count': (Subscription, 'author'),
+    },
+}
+
+
+def change(model, pk, field, delta):
+    """Атомарно изменяет счётчик одним UPDATE без чтения строки."""
+    change_many(model, [pk], field, delta)
+
+
+def change_many(model, pks, field, delta):
+    """Изменяет счётчик сразу у нескольких объектов одним UPDATE."""
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def count_related(related_model, field):
+    """Подзапрос с числом записей related_model, ссылающихся на объект."""
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(count=Count('pk')).values('count')
+        ),
+        0
+    )
+
+
+def reconcile(model, batch_size):
+    """
+    Сверяет счётчики model с реальным числом связей и исправляет их.
+
+    Объекты обрабатываются пачками по первичному ключу, каждая пачка —
+    в своей транзакции с блокировкой строк. Возвращает число
+    исправленных объектов.
+    """
+    counters = COUNTERS[model]
+    actual = {
+        f'actual_{field}': count_related(*source)
+        for field, source in counters.items()
+    }
+    fixed = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                model.objects.select_for_update()
+                .filter(pk__gt=last_pk).order_by('pk')
+                .only('pk', *counters).annotate(**actual)[:batch_size]
+            )
+            if not batch:
+                return fixed
+            last_pk = batch[-1].pk
+            changed = []
+            for obj in batch:
+                drift = False
+                for field in counters:
+                    value = getattr(obj, f'actual_{field}')
+                    if getattr(obj, field) != value:
+                        setattr(obj, field, value)
+                        drift = True
+                if drift:
+                    changed.append(obj)
+            model.objects.bulk_update(changed, list(counters))
+            fixed += len(changed)
@@ -0,0 +1,164 @@
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Q, Window
+from django.db.models.functions import RowNumber
+
+from core.constants import (FEED_BACKFILL_SIZE, FEED_BATCH_SIZE,
+                            FEED_FANOUT_LIMIT)
+from users.models import Subscription
+
+from .models import FeedEntry, Recipe
+
+User = get_user_model()
+
+
+def is_fanned_out(subscribers_count):
+    """Рассылаются ли рецепты автора по лентам подписчиков."""
+    return subscribers_count <= FEED_FANOUT_LIMIT
+
+
+def get_subscribers_count(author_id):
+    return User.objects.values_list(
+        'subscribers_count', flat=True
+    ).get(pk=author_id)
+
+
+def insert(entries, batch_size=FEED_BATCH_SIZE):
+    """
+    Добавляет записи пачками, не собирая их все в памяти.
+
+    Уже существующие записи пропускаются. Возвращает число переданных
+    записей.
+    """
+    entries = iter(entries)
+    total = 0
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            return total
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+
+
+def get_recent_recipe_ids(author_id):
+    return list(
+        Recipe.objects.filter(author_id=author_id)
+        .order_by('-id').values_list('id', flat=True)[:FEED_BACKFILL_SIZE]
+    )
+
+
+def fan_out(recipe):
+    """
+    Записывает новый рецепт в ленты подписчиков автора.
+
+    Для авторов с большим числом подписчиков ничего не пишется: их
+    рецепты подмешиваются при чтении ленты (см. get_recipes).
+    """
+    if not is_fanned_out(recipe.author.subscribers_count):
+        return 0
+    user_ids = Subscription.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    return insert(
+        FeedEntry(user_id=user_id, recipe=recipe, author_id=recipe.author_id)
+        for user_id in user_ids.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if not is_fanned_out(get_subscribers_count(author_id)):
+        return 0
+    return insert(
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id)
+        for recipe_id in get_recent_recipe_ids(author_id)
+    )
+
+
+def backfill_subscribers(author_id):
+    """
+    Добавляет последние рецепты автора в ленты всех подписчиков.
+
+    Нужно, когда число подписчиков опустилось до FEED_FANOUT_LIMIT:
+    рецепты, опубликованные выше порога, в ленты не рассылались.
+    """
+    recipe_ids = get_recent_recipe_ids(author_id)
+    user_ids = Subscription.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    return insert(
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id)
+        for user_id in user_ids.iterator()
+        for recipe_id in recipe_ids
+    )
+
+
+def trim(user_id, author_id):
+    """
+    Убирает рецепты автора из ленты после отписки.
+
+    Если после отписки автор снова опустился до порога рассылки,
+    ленты остальных подписчиков дополняются его рецептами.
+    """
+    deleted, _ = FeedEntry.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
+    if get_subscribers_count(author_id) == FEED_FANOUT_LIMIT:
+        backfill_subscribers(author_id)
+    return deleted
+
+
+def get_recipes(user):
+    """
+    Рецепты ленты пользователя.
+
+    Обычно это соединение с его записями ленты, которое идёт по индексу
+    (user, recipe). Рецепты авторов выше порога рассылки берутся
+    напрямую по подпискам на них.
+    """
+    large_authors = list(
+        Subscription.objects.filter(
+            user=user, author__subscribers_count__gt=FEED_FANOUT_LIMIT
+        ).values_list('author_id', flat=True)
+    )
+    if not large_authors:
+        return Recipe.objects.filter(feed_entries__user=user)
+    return Recipe.objects.filter(
+        Q(Exists(FeedEntry.objects.filter(user=user, recipe=OuterRef('pk'))))
+        | Q(author_id__in=large_authors)
+    )
+
+
+def rebuild(batch_size=FEED_BATCH_SIZE):
+    """
+    Пересобирает все ленты по подпискам.
+
+    В каждую ленту попадают не больше FEED_BACKFILL_SIZE последних
+    рецептов каждого автора, на которого подписан пользователь.
+    Возвращает число записей.
+    """
+    FeedEntry.objects.all().delete()
+    recent = {}
+    recipes = Recipe.objects.filter(
+        author__subscribers_count__lte=FEED_FANOUT_LIMIT
+    ).annotate(
+        position=Window(RowNumber(), partition_by='author', order_by='-id')
+    ).filter(position__lte=FEED_BACKFILL_SIZE).values_list('author_id', 'id')
+    for author_id, recipe_id in recipes.iterator(chunk_size=batch_size):
+        recent.setdefault(author_id, []).append(recipe_id)
+    subscriptions = Subscription.objects.filter(
+        author__subscribers_count__lte=FEED_FANOUT_LIMIT
+    ).values_list('user_id', 'author_id')
+    return insert(
+        (
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe_id, author_id=author_id
+            )
+            for user_id, author_id in subscriptions.iterator(
+                chunk_size=batch_size
+            )
+            for recipe_id in recent.get(author_id, ())
+        ),
+        batch_size
+    )
@@ -1,6 +1,38 @@
+import json
+from collections import defaultdict
+
 import django_filters.rest_framework as filters
+from django.db import connections
+from django.db.models import BooleanField, Case, IntegerField, Q, When
+from django.db.models.expressions import RawSQL
 
 from .models import Ingredient, Recipe
+from .recipe_index import MATCH_ALL, MATCH_ANY, recipe_index
+from .search import search
+
+
+def recipe_ids_condition(queryset, ids):
+    """
+    Условие «id рецепта входит в ids» с одним параметром вместо
+    len(ids): список из индекса может быть длиннее лимита параметров
+    запроса SQLite.
+    """
+    vendor = connections[queryset.db].vendor
+    table = Recipe._meta.db_table
+    if vendor == 'postgresql':
+        return RawSQL(
+            f'{table}.id = ANY(%s)', (ids,), output_field=BooleanField()
+        )
+    if vendor == 'sqlite':
+        return RawSQL(
+            f'{table}.id IN (SELECT value FROM json_each(%s))',
+            (json.dumps(ids),), output_field=BooleanField()
+        )
+    return Q(pk__in=ids)
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
 
 
 class IngredientFilter(filters.FilterSet):
@@ -12,6 +44,15 @@ class IngredientFilter(filters.FilterSet):
 
 
 class RecipeFilter(filters.FilterSet):
+    search = filters.CharFilter(method='filter_search')
+    ingredients = NumberInFilter(method='filter_ingredients')
+    ingredients_match = filters.ChoiceFilter(
+        choices=((MATCH_ALL, 'Все'), (MATCH_ANY, 'Любой')),
+        method='filter_ingredients_option'
+    )
+    ingredients_min = filters.NumberFilter(
+        min_value=1, method='filter_ingredients_option'
+    )
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
@@ -19,7 +60,8 @@ class RecipeFilter(filters.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ['is_favorited', 'is_in_shopping_cart', 'author']
+        fields = ['search', 'ingredients', 'is_favorited',
+                  'is_in_shopping_cart', 'author']
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -32,3 +74,41 @@ class RecipeFilter(filters.FilterSet):
         if user.is_authenticated and value:
             return queryset.filter(shopping_carts__user=user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск, результаты упорядочены по релевантности."""
+        return search(queryset, value)
+
+    def filter_ingredients_option(self, queryset, name, value):
+        """Параметры учитываются в filter_ingredients."""
+        return queryset
+
+    def filter_ingredients(self, queryset, name, value):
+        """
+        Рецепты по имеющимся ингредиентам.
+
+        ?ingredients=1,2,3 — рецепты со всеми перечисленными
+        ингредиентами, с ingredients_match=any — хотя бы с одним,
+        с ingredients_min=K — не меньше чем с K из них. Подбор идёт по
+        индексу в памяти. Первыми выводятся рецепты, для которых есть
+        бóльшая доля ингредиентов, затем с бóльшим числом найденных;
+        место группы хранится в аннотации pantry_rank (меньше — лучше).
+        """
+        options = self.form.cleaned_data
+        min_count = options.get('ingredients_min')
+        matches = recipe_index.match(
+            {int(pk) for pk in value},
+            mode=options.get('ingredients_match') or MATCH_ALL,
+            min_count=int(min_count) if min_count else None
+        )
+        groups = defaultdict(list)
+        for recipe_id, (matched, total) in matches.items():
+            groups[(-matched / total, -matched)].append(recipe_id)
+        return queryset.filter(
+            recipe_ids_condition(queryset, list(matches))
+        ).annotate(pantry_rank=Case(
+            *(When(recipe_ids_condition(queryset, groups[key]), then=rank)
+              for rank, key in enumerate(sorted(groups))),
+            default=None,
+            output_field=IntegerField()
+        )).order_by('pantry_rank', 'id')
@@ -0,0 +1,176 @@
+import bisect
+import gzip
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+from core.constants import (INGREDIENT_CATALOG_BROTLI_QUALITY,
+                            INGREDIENT_CATALOG_GZIP_LEVEL,
+                            INGREDIENT_INDEX_TTL)
+from core.renderers import FastJSONRenderer
+
+from .models import Ingredient, IngredientCatalog
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Символ, который больше любого другого: все строки с префиксом p
+# лежат в отсортированном списке в диапазоне [p, p + MAX_CHAR)
+MAX_CHAR = chr(0x10FFFF)
+
+# Готовый JSON-ответ: тело, хэш содержимого и сжатые варианты тела
+RenderedIngredients = namedtuple(
+    'RenderedIngredients', ('content', 'digest', 'encodings')
+)
+# Состояние индекса, которое не меняется после сборки: читатели берут
+# его целиком, а перестройка подменяет его новым
+IndexSnapshot = namedtuple(
+    'IndexSnapshot',
+    ('keys', 'rows', 'catalog', 'offsets', 'version', 'built_at',
+     'generation')
+)
+
+
+def normalize(value):
+    """Приводит строку к виду для регистронезависимого сравнения."""
+    return unicodedata.normalize('NFC', value).casefold()
+
+
+class IngredientPrefixIndex:
+    """
+    Отсортированный индекс ингредиентов в памяти процесса.
+
+    Отвечает на поиск по началу названия без обращения к БД.
+    Сравнение идёт по casefold(), поэтому кириллица обрабатывается
+    так же, как латиница. Индекс строится при первом обращении,
+    сбрасывается сигналами при изменении ингредиентов и
+    перестраивается, если известная вызывающему версия справочника
+    (IngredientCatalog) отличается от версии индекса. Без версии
+    индекс перестраивается раз в INGREDIENT_INDEX_TTL секунд.
+
+    Вместе с индексом собирается JSON всего справочника в том же
+    порядке, с вариантами gzip и brotli (если установлен). Ответ на
+    поиск по префиксу — срез этого JSON по смещениям строк.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._generation = 0
+
+    def invalidate(self):
+        """
+        Помечает индекс устаревшим.
+
+        Данные остаются на месте для уже начатых запросов; сборка,
+        начатая до вызова, тоже считается устаревшей.
+        """
+        with self._lock:
+            self._generation += 1
+
+    def build(self, version=None):
+        """Загружает ингредиенты из БД и строит индекс."""
+        with self._lock:
+            generation = self._generation
+        if version is None:
+            version = IngredientCatalog.current().version
+        ingredients = sorted(
+            (normalize(name), name, pk, unit)
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ).iterator()
+        )
+        rows = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for _, name, pk, unit in ingredients
+        ]
+        catalog, offsets = self.render_rows(rows)
+        snapshot = IndexSnapshot(
+            tuple(item[0] for item in ingredients), tuple(rows), catalog,
+            tuple(offsets), version, time.monotonic(), generation
+        )
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def render_rows(rows):
+        """
+        Собирает JSON-массив rows и смещения его элементов.
+
+        Элемент i занимает байты offsets[i]:offsets[i + 1] - 1 (без
+        запятой или закрывающей скобки после него).
+        """
+        renderer = FastJSONRenderer()
+        parts = [renderer.render(row) for row in rows]
+        content = b'[' + b','.join(parts) + b']'
+        offsets = [1]
+        for part in parts:
+            offsets.append(offsets[-1] + len(part) + 1)
+        encodings = {
+            'gzip': gzip.compress(
+                content, compresslevel=INGREDIENT_CATALOG_GZIP_LEVEL
+            )
+        }
+        if brotli is not None:
+            encodings['br'] = brotli.compress(
+                content, quality=INGREDIENT_CATALOG_BROTLI_QUALITY
+            )
+        digest = hashlib.sha256(content).hexdigest()
+        return RenderedIngredients(content, digest, encodings), offsets
+
+    def _ensure_built(self, version):
+        """Актуальный снимок индекса; при необходимости перестраивает."""
+        with self._lock:
+            snapshot, generation = self._snapshot, self._generation
+        if snapshot is None or snapshot.generation != generation:
+            return self.build(version)
+        if version is not None:
+            if version != snapshot.version:
+                return self.build(version)
+        elif time.monotonic() - snapshot.built_at > INGREDIENT_INDEX_TTL:
+            return self.build()
+        return snapshot
+
+    def _find(self, keys, prefix):
+        prefix = normalize(prefix)
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + MAX_CHAR, lo=start)
+        return start, end
+
+    def search(self, prefix, version=None):
+        """Возвращает ингредиенты, название которых начинается с prefix."""
+        snapshot = self._ensure_built(version)
+        start, end = self._find(snapshot.keys, prefix)
+        return list(snapshot.rows[start:end])
+
+    def render(self, prefix='', version=None):
+        """
+        Готовый JSON ингредиентов, название которых начинается с prefix.
+
+        Без префикса возвращается собранный заранее справочник целиком,
+        вместе со сжатыми вариантами. Для префикса тело вырезается из
+        него без сериализации; сжатых вариантов у среза нет.
+        """
+        snapshot = self._ensure_built(version)
+        catalog, offsets = snapshot.catalog, snapshot.offsets
+        if not prefix:
+            return catalog
+        start, end = self._find(snapshot.keys, prefix)
+        if start == end:
+            content = b'[]'
+        else:
+            content = (
+                b'[' + catalog.content[offsets[start]:offsets[end] - 1]
+                + b']'
+            )
+        return RenderedIngredients(
+            content, f'{catalog.digest}:{start}:{end}', {}
+        )
+
+
+ingredient_index = IngredientPrefixIndex()
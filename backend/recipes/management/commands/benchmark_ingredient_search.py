@@ -0,0 +1,90 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+from recipes.serializers import IngredientSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск ингредиентов по началу названия через ORM '
+        'и через индекс в памяти'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз повторить каждый запрос'
+        )
+        parser.add_argument(
+            '--prefix-length', type=int, default=2,
+            help='Длина префиксов, взятых из названий ингредиентов'
+        )
+
+    def measure(self, func, prefixes, repeat):
+        timings = []
+        for prefix in prefixes:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func(prefix)
+                timings.append(time.perf_counter() - start)
+        timings.sort()
+        return (
+            statistics.mean(timings) * 1000,
+            timings[int(len(timings) * 0.95)] * 1000
+        )
+
+    def handle(self, *args, **options):
+        length = options['prefix_length']
+        prefixes = sorted({
+            name[:length] for name in
+            Ingredient.objects.values_list('name', flat=True)
+            if len(name) >= length
+        })
+        if not prefixes:
+            self.stdout.write(self.style.ERROR('Нет ингредиентов'))
+            return
+
+        def orm_search(prefix):
+            return IngredientSerializer(
+                Ingredient.objects.filter(name__istartswith=prefix),
+                many=True
+            ).data
+
+        start = time.perf_counter()
+        ingredient_index.build()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        mismatches = sum(
+            {item['id'] for item in orm_search(prefix)}
+            != {item['id'] for item in ingredient_index.search(prefix)}
+            for prefix in prefixes
+        )
+        orm_mean, orm_p95 = self.measure(
+            orm_search, prefixes, options['repeat']
+        )
+        index_mean, index_p95 = self.measure(
+            ingredient_index.search, prefixes, options['repeat']
+        )
+
+        self.stdout.write(
+            f'Префиксов: {len(prefixes)}, '
+            f'построение индекса: {build_ms:.1f} мс'
+        )
+        self.stdout.write(
+            f'ORM:    среднее {orm_mean:.3f} мс, p95 {orm_p95:.3f} мс'
+        )
+        self.stdout.write(
+            f'Индекс: среднее {index_mean:.3f} мс, p95 {index_p95:.3f} мс'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: x{orm_mean / index_mean:.0f}'
+        ))
+        if mismatches:
+            self.stdout.write(self.style.WARNING(
+                f'Результаты различаются для {mismatches} префиксов '
+                '(например, LIKE в SQLite не учитывает регистр кириллицы)'
+            ))
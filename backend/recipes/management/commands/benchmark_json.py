@@ -0,0 +1,118 @@
+import base64
+import io
+import os
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+from recipes.models import Recipe
+from recipes.serializers import RecipeReadSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает JSONRenderer из DRF с FastJSONRenderer на страницах '
+        'RecipeReadSerializer, а JSONParser с FastJSONParser на телах '
+        'создания рецепта'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-sizes', type=int, nargs='+', default=[6, 50, 100],
+            help='Размеры страниц рецептов'
+        )
+        parser.add_argument(
+            '--image-size', type=int, default=100_000,
+            help='Размер картинки в теле создания рецепта, байт'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Сколько раз рендерить и разбирать каждое тело'
+        )
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
+
+    def get_page(self, size):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = AnonymousUser()
+        recipes = Recipe.objects.for_read(request.user).order_by('-id')
+        return {
+            'count': size,
+            'next': None,
+            'previous': None,
+            'results': RecipeReadSerializer(
+                recipes[:size], many=True, context={'request': request}
+            ).data,
+        }
+
+    def get_write_body(self, recipe, image_size):
+        image = base64.b64encode(os.urandom(image_size)).decode()
+        return JSONRenderer().render({
+            'name': recipe['name'],
+            'text': recipe['text'],
+            'cooking_time': recipe['cooking_time'],
+            'ingredients': [
+                {'id': item['id'], 'amount': item['amount']}
+                for item in recipe['ingredients']
+            ],
+            'image': f'data:image/png;base64,{image}',
+        })
+
+    def compare(self, title, size, drf, fast, repeat):
+        drf_ms = self.measure(drf, repeat)
+        fast_ms = self.measure(fast, repeat)
+        self.stdout.write(
+            f'{title}, {size} байт: {drf_ms:.3f} → {fast_ms:.3f} мс '
+            f'(x{drf_ms / fast_ms:.1f})'
+        )
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson не установлен: быстрые классы работают как '
+                'классы DRF'
+            ))
+        repeat = options['repeat']
+        for size in options['page_sizes']:
+            page = self.get_page(size)
+            if not page['results']:
+                raise CommandError('Нет рецептов')
+            body = JSONRenderer().render(page)
+            if FastJSONRenderer().render(page) != body:
+                raise CommandError(
+                    f'Страница из {size} рецептов рендерится по-разному'
+                )
+            self.compare(
+                f'Рендер {len(page["results"])} рецептов', len(body),
+                lambda: JSONRenderer().render(page),
+                lambda: FastJSONRenderer().render(page),
+                repeat
+            )
+
+        body = self.get_write_body(
+            page['results'][0], options['image_size']
+        )
+        if FastJSONParser().parse(io.BytesIO(body)) != (
+            JSONParser().parse(io.BytesIO(body))
+        ):
+            raise CommandError('Тело рецепта разбирается по-разному')
+        self.compare(
+            'Разбор тела рецепта', len(body),
+            lambda: JSONParser().parse(io.BytesIO(body)),
+            lambda: FastJSONParser().parse(io.BytesIO(body)),
+            repeat
+        )
+        self.stdout.write(self.style.SUCCESS('Результаты совпадают'))
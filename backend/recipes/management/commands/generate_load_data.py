@@ -0,0 +1,227 @@
+import random
+import time
+from bisect import bisect
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart)
+from users.models import Subscription
+
+User = get_user_model()
+
+WORDS = (
+    'суп', 'салат', 'пирог', 'каша', 'рагу', 'запеканка', 'паста', 'плов',
+    'борщ', 'омлет', 'блины', 'котлеты', 'сырники', 'жаркое', 'уха',
+    'домашний', 'быстрый', 'летний', 'острый', 'сливочный', 'грибной',
+    'овощной', 'куриный', 'рыбный', 'постный', 'праздничный', 'бабушкин',
+)
+
+
+class PowerLaw:
+    """Выбор индексов 0..n-1 с весами 1 / (i + 1) ** alpha."""
+
+    def __init__(self, rng, size, alpha):
+        self.rng = rng
+        self.cum_weights = list(accumulate(
+            1 / (rank + 1) ** alpha for rank in range(size)
+        ))
+        self.total = self.cum_weights[-1]
+
+    def choice(self):
+        return bisect(self.cum_weights, self.rng.random() * self.total)
+
+    def sample(self, count, exclude=None):
+        """count различных индексов; популярные выпадают чаще."""
+        count = min(count, len(self.cum_weights) - (exclude is not None))
+        chosen = set()
+        while len(chosen) < count:
+            index = self.choice()
+            if index != exclude:
+                chosen.add(index)
+        return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует воспроизводимый набор данных для нагрузочного '
+        'тестирования: пользователей, рецепты, избранное, корзины и '
+        'подписки со степенным распределением популярности'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее число рецептов в избранном у пользователя'
+        )
+        parser.add_argument(
+            '--carts', type=float, default=5,
+            help='Среднее число рецептов в корзине у пользователя'
+        )
+        parser.add_argument(
+            '--subscriptions', type=float, default=10,
+            help='Среднее число подписок у пользователя'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, nargs=3, default=(3, 8, 20),
+            metavar=('MIN', 'MODE', 'MAX'),
+            help='Треугольное распределение числа ингредиентов в рецепте'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного распределения популярности'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Префикс имён и почты создаваемых пользователей'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Сколько строк вставлять за один запрос'
+        )
+
+    def log(self, message):
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f'[{elapsed:7.1f} с] {message}')
+
+    def insert(self, model, objects):
+        """Вставляет объекты порциями, каждая порция в своей транзакции."""
+        created = []
+        chunk = []
+        for obj in objects:
+            chunk.append(obj)
+            if len(chunk) >= self.chunk_size:
+                created += self.flush(model, chunk)
+                chunk = []
+        if chunk:
+            created += self.flush(model, chunk)
+        self.log(f'{model._meta.verbose_name_plural}: {len(created)}')
+        return created
+
+    def flush(self, model, chunk):
+        with transaction.atomic():
+            return model.objects.bulk_create(chunk, batch_size=len(chunk))
+
+    def per_user_count(self, mean):
+        """Число связей у пользователя: у большинства мало, у немногих —
+        очень много (распределение Парето со средним mean)."""
+        if mean <= 0:
+            return 0
+        shape = 2.0
+        return int(self.rng.paretovariate(shape) * mean * (shape - 1) / shape)
+
+    def create_users(self, count, prefix):
+        password = make_password(f'{prefix}-password')
+        return [user.pk for user in self.insert(User, (
+            User(
+                username=f'{prefix}_{i}',
+                email=f'{prefix}_{i}@example.com',
+                first_name=f'Имя{i}',
+                last_name=f'Фамилия{i}',
+                password=password,
+            )
+            for i in range(count)
+        ))]
+
+    def create_recipes(self, count, user_ids, alpha):
+        authors = PowerLaw(self.rng, len(user_ids), alpha)
+        return [recipe.pk for recipe in self.insert(Recipe, (
+            Recipe(
+                author_id=user_ids[authors.choice()],
+                name=' '.join(self.rng.sample(WORDS, 3)).capitalize()
+                + f' №{i}',
+                text=' '.join(self.rng.choices(WORDS, k=30)),
+                image='recipes/images/load.png',
+                cooking_time=self.rng.randint(5, 180),
+            )
+            for i in range(count)
+        ))]
+
+    def create_recipe_ingredients(self, recipe_ids, ingredient_ids, bounds,
+                                  alpha):
+        popular = PowerLaw(self.rng, len(ingredient_ids), alpha)
+        low, mode, high = bounds
+
+        def rows():
+            for recipe_id in recipe_ids:
+                count = round(self.rng.triangular(low, high, mode))
+                for index in popular.sample(count):
+                    yield RecipeIngredient(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_ids[index],
+                        amount=self.rng.randint(1, 500),
+                    )
+
+        self.insert(RecipeIngredient, rows())
+
+    def create_user_relations(self, model, user_ids, target_ids, mean,
+                              alpha, field):
+        targets = PowerLaw(self.rng, len(target_ids), alpha)
+        positions = {pk: i for i, pk in enumerate(target_ids)}
+
+        def rows():
+            for user_id in user_ids:
+                chosen = targets.sample(
+                    self.per_user_count(mean),
+                    exclude=positions.get(user_id)
+                )
+                for index in chosen:
+                    yield model(user_id=user_id,
+                                **{field: target_ids[index]})
+
+        self.insert(model, rows())
+
+    def handle(self, *args, **options):
+        self.started = time.monotonic()
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        prefix = options['prefix']
+        alpha = options['alpha']
+
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        if not ingredient_ids:
+            raise CommandError(
+                'Справочник ингредиентов пуст: выполните import_ingredients'
+            )
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix}_ уже есть: '
+                'укажите другой --prefix'
+            )
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя')
+
+        user_ids = self.create_users(options['users'], prefix)
+        recipe_ids = self.create_recipes(options['recipes'], user_ids, alpha)
+        self.create_recipe_ingredients(
+            recipe_ids, ingredient_ids, options['ingredients'], alpha
+        )
+        if recipe_ids:
+            self.create_user_relations(
+                Favorite, user_ids, recipe_ids,
+                options['favorites'], alpha, 'recipe_id'
+            )
+            self.create_user_relations(
+                ShoppingCart, user_ids, recipe_ids,
+                options['carts'], alpha, 'recipe_id'
+            )
+        self.create_user_relations(
+            Subscription, user_ids, user_ids,
+            options['subscriptions'], alpha, 'author_id'
+        )
+
+        self.log('Пересчёт счётчиков, списков покупок и лент')
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        call_command('rebuild_feeds', stdout=self.stdout)
+        self.log('Готово')
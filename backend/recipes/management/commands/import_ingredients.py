@@ -1,37 +1,139 @@
 import csv
+import hashlib
+import json
+from itertools import islice
 from pathlib import Path
 
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 from tqdm import tqdm
 
-from recipes.models import Ingredient
+from core import response_cache
+from core.constants import INGREDIENTS_FILE, INGREDIENTS_IMPORT_BATCH_SIZE
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient, IngredientCatalog
 
 
 class Command(BaseCommand):
-    help = 'Импортирует ингредиенты из файла ingredients.csv'
+    help = (
+        'Импортирует ингредиенты из CSV (название,единица) или JSON '
+        '([{"name": ..., "measurement_unit": ...}]). Повторный запуск '
+        'с тем же файлом пропускается'
+    )
 
-    def handle(self, *args, **options):
-        file_path = Path('./data/ingredients.csv')
-        if not file_path.exists():
-            self.stdout.write(self.style.ERROR(f"Файл {file_path} не найден"))
-            return
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=INGREDIENTS_FILE,
+            help='Путь к файлу ingredients.csv или ingredients.json'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=INGREDIENTS_IMPORT_BATCH_SIZE,
+            help='Сколько строк вставлять за один запрос'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Импортировать, даже если файл не изменился'
+        )
 
+    def get_checksum(self, file_path):
+        digest = hashlib.sha256()
+        with file_path.open('rb') as file:
+            for chunk in iter(lambda: file.read(1 << 16), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def read_csv(self, file_path):
         with file_path.open(encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            count = 0
-            for row in tqdm(
-                reader, desc='Загрузка ингредиентов', unit=' строк'
-            ):
+            for row in csv.reader(csvfile):
                 if len(row) != 2:
                     self.stdout.write(self.style.WARNING(
                         f"Пропущена строка: {row}"
                     ))
                     continue
-                name, unit = row
-                Ingredient.objects.get_or_create(
-                    name=name.strip(), measurement_unit=unit.strip()
-                )
-                count += 1
+                yield row
+
+    def read_json(self, file_path):
+        # Справочник небольшой, поэтому JSON читается целиком
+        with file_path.open(encoding='utf-8') as jsonfile:
+            for item in json.load(jsonfile):
+                try:
+                    yield item['name'], item['measurement_unit']
+                except (KeyError, TypeError):
+                    self.stdout.write(self.style.WARNING(
+                        f"Пропущена запись: {item}"
+                    ))
+
+    def read_rows(self, file_path):
+        reader = (
+            self.read_json if file_path.suffix.lower() == '.json'
+            else self.read_csv
+        )
+        for name, unit in reader(file_path):
+            yield name.strip(), unit.strip()
+
+    def insert_with_copy(self, batch):
+        """PostgreSQL: COPY во временную таблицу и INSERT без конфликтов."""
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS import_ingredient '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            cursor.execute('TRUNCATE import_ingredient')
+            with cursor.copy(
+                'COPY import_ingredient (name, measurement_unit) FROM STDIN'
+            ) as copy:
+                for row in batch:
+                    copy.write_row(row)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT name, measurement_unit FROM import_ingredient '
+                'ON CONFLICT ON CONSTRAINT unique_name_unit DO NOTHING'
+            )
+
+    def insert_with_bulk_create(self, batch):
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in batch
+            ),
+            ignore_conflicts=True
+        )
+
+    def handle(self, *args, **options):
+        file_path = Path(options['path'])
+        if not file_path.exists():
+            self.stdout.write(self.style.ERROR(f"Файл {file_path} не найден"))
+            return
+
+        checksum = self.get_checksum(file_path)
+        catalog = IngredientCatalog.current()
+        if catalog.source_checksum == checksum and not options['force']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Файл {file_path} не изменился, импорт пропущен"
+            ))
+            return
+
+        insert = (
+            self.insert_with_copy if connection.vendor == 'postgresql'
+            else self.insert_with_bulk_create
+        )
+        rows = iter(tqdm(
+            self.read_rows(file_path),
+            desc='Загрузка ингредиентов', unit=' строк'
+        ))
+        with transaction.atomic():
+            before = Ingredient.objects.count()
+            while batch := list(islice(rows, options['batch_size'])):
+                insert(batch)
+            count = Ingredient.objects.count() - before
+            if count:
+                IngredientCatalog.bump()
+                response_cache.invalidate('ingredients')
+            IngredientCatalog.objects.filter(pk=catalog.pk).update(
+                source_checksum=checksum
+            )
+        ingredient_index.invalidate()
 
         self.stdout.write(self.style.SUCCESS(
             f"Импортировано {count} ингредиентов")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.constants import FEED_BATCH_SIZE
+from recipes import feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает ленты подписок (FeedEntry) по текущим подпискам '
+        'и рецептам авторов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=FEED_BATCH_SIZE,
+            help='Сколько записей ленты добавлять за один запрос'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = feed.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Записей в лентах: {count}'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from recipes.search import create_index, drop_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздаёт полнотекстовый индекс рецептов, например после '
+        'миграций, пересоздавших таблицу рецептов в SQLite'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drop_index(connection)
+            create_index(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс поиска пересоздан ({connection.vendor})'
+        ))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from core.constants import SHOPPING_LIST_CHUNK_SIZE
+from recipes import shopping_list
+from recipes.models import ShoppingCart, ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет и пересобирает итоги списков покупок (ShoppingListItem) '
+        'по корзинам пользователей'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=SHOPPING_LIST_CHUNK_SIZE,
+            help='Сколько пользователей обрабатывать за одну транзакцию'
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только проверить расхождения, ничего не меняя'
+        )
+
+    def get_user_ids(self):
+        carts = ShoppingCart.objects.values_list('user_id', flat=True)
+        items = ShoppingListItem.objects.values_list('user_id', flat=True)
+        return sorted(set(carts.distinct()) | set(items.distinct()))
+
+    def count_drift(self, user_ids):
+        expected = shopping_list.calculate_totals(user_ids)
+        stored = {
+            key: total for key, (_, total) in
+            shopping_list.get_stored_totals(user_ids).items()
+        }
+        return sum(
+            expected.get(key) != stored.get(key)
+            for key in expected.keys() | stored.keys()
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        user_ids = self.get_user_ids()
+        drift = 0
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            if options['verify']:
+                drift += self.count_drift(chunk)
+            else:
+                drift += shopping_list.refresh(chunk)
+
+        if options['verify']:
+            style = self.style.WARNING if drift else self.style.SUCCESS
+            self.stdout.write(style(
+                f'Пользователей: {len(user_ids)}, расхождений: {drift}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Пользователей: {len(user_ids)}, исправлено строк: {drift}'
+            ))
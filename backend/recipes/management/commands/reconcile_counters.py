@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.constants import COUNTERS_BATCH_SIZE
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики рецептов и пользователей '
+        'и исправляет расхождения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=COUNTERS_BATCH_SIZE,
+            help='Сколько объектов сверять за одну транзакцию'
+        )
+
+    def handle(self, *args, **options):
+        for model in counters.COUNTERS:
+            fixed = counters.reconcile(model, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: исправлено {fixed}'
+            ))
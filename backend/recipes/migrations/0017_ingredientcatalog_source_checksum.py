@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipe_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredientcatalog',
+            name='source_checksum',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Контрольная сумма последнего импорта'),
+        ),
+    ]
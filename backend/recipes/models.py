@@ -2,6 +2,8 @@
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Prefetch, Value
+from django.utils import timezone
 
 from core.constants import (IMAGE_UPLOAD_PATH, MAX_NAME_LENGTH, MAX_UOF_LENGTH,
                             MIN_COOKING_TIME)
@@ -30,6 +32,89 @@ class Ingredient(models.Model):
         return f'{self.name} ({self.measurement_unit})'
 
 
+class IngredientCatalog(models.Model):
+    """
+    Версия справочника ингредиентов.
+
+    Единственная запись, версия которой растёт при любом изменении
+    ингредиентов. Служит дешёвой отметкой для ETag и для сброса
+    кэшей справочника во всех процессах.
+    """
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменён'
+    )
+    source_checksum = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Контрольная сумма последнего импорта'
+    )
+
+    class Meta:
+        verbose_name = 'Версия справочника ингредиентов'
+        verbose_name_plural = 'Версии справочника ингредиентов'
+
+    def __str__(self):
+        return f'Справочник ингредиентов v{self.version}'
+
+    @classmethod
+    def current(cls):
+        """Возвращает текущую запись версии справочника."""
+        catalog, _ = cls.objects.get_or_create(pk=1)
+        return catalog
+
+    @classmethod
+    def bump(cls):
+        """Увеличивает версию справочника."""
+        if not cls.objects.filter(pk=1).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        ):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1})
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов рецептов с заготовками для чтения."""
+
+    def with_user_flags(self, user):
+        """Аннотирует is_favorited и is_in_shopping_cart для user."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False)
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+        )
+
+    def for_read(self, user):
+        """
+        Подготавливает рецепты к RecipeReadSerializer.
+
+        Автор, ингредиенты и флаги пользователя загружаются
+        фиксированным числом запросов независимо от размера страницы.
+        Подписки на авторов проверяет users.subscriptions.
+        """
+        return self.with_user_flags(user).select_related(
+            'author'
+        ).prefetch_related(
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                )
+            )
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -56,9 +141,34 @@ class Recipe(models.Model):
         validators=[MinValueValidator(MIN_COOKING_TIME)],
         verbose_name='Время приготовления'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Изменён'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном раз'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзинах раз'
+    )
+    short_link_hits = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Переходов по короткой ссылке'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='recipe_name_id_idx')
+        ]
         default_related_name = 'recipes'
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
@@ -98,6 +208,9 @@ class RecipeIngredient(models.Model):
 
 
 class UserRecipeBase(models.Model):
+    # Поле-счётчик рецепта, которое отражает число связей
+    recipe_counter = None
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -123,6 +236,8 @@ class UserRecipeBase(models.Model):
 
 
 class Favorite(UserRecipeBase):
+    recipe_counter = 'favorites_count'
+
     class Meta(UserRecipeBase.Meta):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
@@ -130,7 +245,95 @@ class Favorite(UserRecipeBase):
 
 
 class ShoppingCart(UserRecipeBase):
+    recipe_counter = 'in_carts_count'
+
     class Meta(UserRecipeBase.Meta):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
         default_related_name = 'shopping_carts'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Суммарное количество ингредиента в корзине пользователя.
+
+    Материализованный итог по RecipeIngredient и ShoppingCart;
+    поддерживается в тех же транзакциях, что меняют корзину и
+    ингредиенты рецептов (см. recipes.shopping_list).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    total = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+        default_related_name = 'shopping_list_items'
+        ordering = ['ingredient__name']
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} — {self.total}'
+
+
+class FeedEntry(models.Model):
+    """
+    Рецепт в ленте подписок пользователя.
+
+    Строки пишутся при публикации рецепта всем подписчикам автора,
+    добавляются при подписке и удаляются при отписке (см. recipes.feed).
+    Автор хранится отдельно, чтобы отписка не требовала соединения
+    с рецептами.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'], name='feed_entry_user_author_idx'
+            )
+        ]
+        ordering = ['user', '-recipe']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+
+    def __str__(self):
+        return f'{self.user}: {self.recipe}'
@@ -0,0 +1,96 @@
+from django.db.models import Window
+from django.db.models.functions import RowNumber
+
+from core.projections import Projection, file_urls
+from users.projections import UserProjection
+
+from .models import Recipe, RecipeIngredient
+
+
+class RecipeProjection(Projection):
+    """
+    Проекция RecipeReadSerializer.
+
+    Рецепты с автором и флагами пользователя берутся одним запросом
+    values(), ингредиенты страницы — вторым запросом кортежами.
+    """
+    author = UserProjection(prefix='author__')
+    fields = (
+        'id', 'name', 'text', 'image', 'cooking_time', *author.fields
+    )
+
+    def get_ingredients(self, recipe_ids):
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        if not recipe_ids:
+            return ingredients
+        rows = RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        )
+        for recipe_id, pk, name, measurement_unit, amount in rows:
+            ingredients[recipe_id].append({
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            })
+        return ingredients
+
+    def render(self, rows, request):
+        ingredients = self.get_ingredients([row['id'] for row in rows])
+        author = self.author.get_builder(rows, request)
+        image_url = file_urls(request, Recipe, 'image')
+        return [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'text': row['text'],
+                'image': image_url(row['image']),
+                'cooking_time': row['cooking_time'],
+                'ingredients': ingredients[row['id']],
+                'author': author(row),
+                'is_favorited': row['is_favorited'],
+                'is_in_shopping_cart': row['is_in_shopping_cart'],
+            }
+            for row in rows
+        ]
+
+
+class ShortRecipeProjection(Projection):
+    """Проекция ShortRecipeSerializer."""
+    fields = ('id', 'name', 'image', 'cooking_time')
+
+    def to_dict(self, row, image_url):
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'image': image_url(row['image']),
+            'cooking_time': row['cooking_time'],
+        }
+
+    def render(self, rows, request):
+        image_url = file_urls(request, Recipe, 'image')
+        return [self.to_dict(row, image_url) for row in rows]
+
+    def render_by_author(self, author_ids, request, limit=None):
+        """
+        Рецепты авторов в порядке (name, id), не больше limit на автора.
+
+        Ограничение считается оконной функцией в одном запросе, как
+        в prefetch подписок. Возвращает {author_id: [рецепты]}.
+        """
+        recipes = Recipe.objects.filter(
+            author_id__in=author_ids
+        ).order_by('author_id', 'name', 'id')
+        if limit is not None:
+            recipes = recipes.annotate(position=Window(
+                RowNumber(), partition_by='author',
+                order_by=('name', 'id')
+            )).filter(position__lte=limit)
+        image_url = file_urls(request, Recipe, 'image')
+        result = {author_id: [] for author_id in author_ids}
+        for row in recipes.values('author_id', *self.fields):
+            result[row['author_id']].append(self.to_dict(row, image_url))
+        return result
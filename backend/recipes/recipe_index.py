@@ -0,0 +1,203 @@
+import bisect
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict, namedtuple
+from datetime import timedelta
+from itertools import chain
+
+from django.db.models import Count, Max
+
+from core.constants import (RECIPE_INDEX_SYNC_INTERVAL,
+                            RECIPE_INDEX_SYNC_OVERLAP, RECIPE_INDEX_TTL)
+
+from .models import Recipe
+
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+# До такого числа проверок пересечение ищется бинарным поиском,
+# дальше быстрее пересечь множества
+SMALL_INTERSECTION = 256
+
+# Данные индекса одной сборки. Сверка дополняет их на месте под
+# блокировкой, перестройка подменяет целиком, поэтому читатель,
+# взявший состояние, не останется без данных
+IndexState = namedtuple(
+    'IndexState', ('postings', 'recipes', 'built_at', 'generation')
+)
+
+
+def contains(postings, recipe_id):
+    """Есть ли recipe_id в отсортированном массиве."""
+    index = bisect.bisect_left(postings, recipe_id)
+    return index < len(postings) and postings[index] == recipe_id
+
+
+class IngredientRecipeIndex:
+    """
+    Обратный индекс «ингредиент → рецепты» в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id
+    рецептов с ним, для каждого рецепта — его ингредиенты. Пересечение
+    начинается с самого короткого массива: короткие проверяются
+    в остальных бинарным поиском за микросекунды, длинные
+    пересекаются как множества.
+
+    Индекс догоняет БД по изменённым рецептам (Recipe.updated_at
+    меняется при любом изменении состава, в том числе строк
+    RecipeIngredient, см. signals) и по списку id рецептов,
+    если их число разошлось с БД, а раз в RECIPE_INDEX_TTL секунд
+    перестраивается целиком.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._generation = 0
+        self._stamp = None
+        self._checked_at = 0
+
+    def invalidate(self):
+        """
+        Помечает индекс устаревшим.
+
+        Данные остаются на месте для уже начатых запросов; сборка,
+        начатая до вызова, тоже считается устаревшей.
+        """
+        with self._lock:
+            self._generation += 1
+
+    def get_stamp(self):
+        stamp = Recipe.objects.aggregate(
+            count=Count('id'), updated_at=Max('updated_at')
+        )
+        return stamp['count'], stamp['updated_at']
+
+    def load(self, queryset):
+        """Состав рецептов: {id рецепта: (id ингредиентов, ...)}."""
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in queryset.order_by('id').values_list(
+            'id', 'recipe_ingredients__ingredient_id'
+        ).iterator():
+            ingredients = recipes[recipe_id]
+            if ingredient_id is not None:
+                ingredients.append(ingredient_id)
+        return {pk: tuple(ingredients) for pk, ingredients in recipes.items()}
+
+    def build(self):
+        """Строит индекс по всем рецептам."""
+        with self._lock:
+            generation = self._generation
+        stamp = self.get_stamp()
+        recipes = self.load(Recipe.objects.all())
+        postings = defaultdict(list)
+        for recipe_id, ingredients in recipes.items():
+            for ingredient_id in ingredients:
+                postings[ingredient_id].append(recipe_id)
+        state = IndexState(
+            {
+                ingredient_id: array('q', recipe_ids)
+                for ingredient_id, recipe_ids in postings.items()
+            },
+            recipes, time.monotonic(), generation
+        )
+        with self._lock:
+            self._state = state
+            self._stamp = stamp
+            self._checked_at = state.built_at
+        return state
+
+    @staticmethod
+    def _remove(state, recipe_id):
+        for ingredient_id in state.recipes.pop(recipe_id, ()):
+            postings = state.postings[ingredient_id]
+            del postings[bisect.bisect_left(postings, recipe_id)]
+
+    @staticmethod
+    def _add(state, recipe_id, ingredients):
+        state.recipes[recipe_id] = ingredients
+        for ingredient_id in ingredients:
+            postings = state.postings.setdefault(ingredient_id, array('q'))
+            postings.insert(bisect.bisect(postings, recipe_id), recipe_id)
+
+    def apply(self, state, recipes, removed=()):
+        """Заменяет состав recipes и удаляет рецепты removed."""
+        with self._lock:
+            for recipe_id in chain(recipes, removed):
+                self._remove(state, recipe_id)
+            for recipe_id, ingredients in recipes.items():
+                self._add(state, recipe_id, ingredients)
+
+    def sync(self, state):
+        """Догоняет изменения рецептов с прошлой сверки."""
+        stamp = self.get_stamp()
+        self._checked_at = time.monotonic()
+        if stamp == self._stamp:
+            return
+        _, updated_at = self._stamp
+        changed = Recipe.objects.all()
+        if updated_at is not None:
+            changed = changed.filter(updated_at__gte=updated_at - timedelta(
+                seconds=RECIPE_INDEX_SYNC_OVERLAP
+            ))
+        self.apply(state, self.load(changed))
+        if len(state.recipes) != stamp[0]:
+            present = set(Recipe.objects.values_list('id', flat=True))
+            with self._lock:
+                known = set(state.recipes)
+            added = Recipe.objects.filter(pk__in=present - known)
+            self.apply(state, self.load(added), removed=known - present)
+        self._stamp = stamp
+
+    def _ensure_fresh(self):
+        """Актуальное состояние индекса; при необходимости догоняет БД."""
+        with self._lock:
+            state, generation = self._state, self._generation
+        now = time.monotonic()
+        if (state is None or state.generation != generation
+                or now - state.built_at > RECIPE_INDEX_TTL):
+            return self.build()
+        if now - self._checked_at > RECIPE_INDEX_SYNC_INTERVAL:
+            self.sync(state)
+        return state
+
+    def match(self, ingredient_ids, mode=MATCH_ALL, min_count=None):
+        """
+        Рецепты, в которых есть все (mode='all'), хотя бы один
+        (mode='any') или не меньше min_count из ingredient_ids.
+
+        Возвращает {id рецепта: (найдено ингредиентов, всего в рецепте)}.
+        """
+        ingredient_ids = set(ingredient_ids)
+        if not ingredient_ids:
+            return {}
+        state = self._ensure_fresh()
+        with self._lock:
+            lists = sorted(
+                (state.postings.get(pk, ()) for pk in ingredient_ids),
+                key=len
+            )
+            if min_count is None and mode == MATCH_ALL:
+                smallest, others = lists[0], lists[1:]
+                if len(smallest) * len(others) < SMALL_INTERSECTION:
+                    found = [
+                        recipe_id for recipe_id in smallest
+                        if all(contains(other, recipe_id) for other in others)
+                    ]
+                else:
+                    found = set(smallest).intersection(*others)
+                matched = dict.fromkeys(found, len(lists))
+            else:
+                counts = Counter(chain.from_iterable(lists))
+                threshold = min_count or 1
+                matched = {
+                    recipe_id: count for recipe_id, count in counts.items()
+                    if count >= threshold
+                }
+            return {
+                recipe_id: (count, len(state.recipes[recipe_id]))
+                for recipe_id, count in matched.items()
+            }
+
+
+recipe_index = IngredientRecipeIndex()
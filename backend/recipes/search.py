@@ -0,0 +1,173 @@
+"""
+Полнотекстовый поиск рецептов по названию и описанию.
+
+В PostgreSQL у таблицы рецептов есть генерируемый столбец search_vector
+(tsvector с русской морфологией, название весомее описания) и GIN-индекс
+по нему: база обновляет их сама при любой записи. В SQLite для
+локального запуска используется таблица FTS5 с внешним содержимым,
+которую синхронизируют триггеры. Остальные СУБД ищут через icontains.
+
+Слова запроса ищутся как начала слов и должны найтись все: в SQLite
+это префиксный запрос FTS5, в PostgreSQL — to_tsquery с :*. Морфология
+есть только в PostgreSQL, поэтому там находятся и другие формы слов.
+
+Индекс создаётся миграцией 0018 со своей копией SQL, пересоздать его
+можно командой rebuild_search_index. В SQLite любая миграция, которая
+пересоздаёт таблицу рецептов (AddField, AlterField, RemoveField и т. п.),
+молча удаляет триггеры; такая миграция должна создать их заново, как
+0019, а проверка recipes.W001 (checks.py) сообщает об их отсутствии.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+RECIPE_TABLE = 'recipes_recipe'
+FTS_TABLE = 'recipes_recipe_fts'
+SEARCH_CONFIG = 'russian'
+# Вес совпадений в названии относительно описания для bm25 в SQLite
+SQLITE_NAME_WEIGHT = 10.0
+
+POSTGRESQL_CREATE = (
+    f"""
+    ALTER TABLE {RECIPE_TABLE} ADD COLUMN IF NOT EXISTS search_vector
+    tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'B')
+    ) STORED
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS recipe_search_vector_idx
+    ON {RECIPE_TABLE} USING GIN (search_vector)
+    """,
+)
+POSTGRESQL_DROP = (
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+    f'ALTER TABLE {RECIPE_TABLE} DROP COLUMN IF EXISTS search_vector',
+)
+SQLITE_CREATE = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, text, content='{RECIPE_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON {RECIPE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON {RECIPE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF name, text ON {RECIPE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+SQLITE_TRIGGERS = (
+    f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update'
+)
+SQLITE_DROP = (
+    *(f'DROP TRIGGER IF EXISTS {trigger}' for trigger in SQLITE_TRIGGERS),
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+STATEMENTS = {
+    'postgresql': (POSTGRESQL_CREATE, POSTGRESQL_DROP),
+    'sqlite': (SQLITE_CREATE, SQLITE_DROP),
+}
+
+
+def create_index(connection):
+    """
+    Создаёт индекс, если его нет, и заполняет его.
+
+    Повторный вызов безопасен. В SQLite он нужен после миграций, которые
+    пересоздают таблицу рецептов: вместе со старой таблицей удаляются
+    и триггеры.
+    """
+    statements, _ = STATEMENTS.get(connection.vendor, ((), ()))
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def drop_index(connection):
+    _, statements = STATEMENTS.get(connection.vendor, ((), ()))
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def split_terms(query):
+    """Слова запроса: буквы и цифры, всё остальное — разделители."""
+    return re.findall(r'[^\W_]+', query)
+
+
+def to_fts5_query(query):
+    """Слова запроса как префиксы, все обязательны: «бор суп» →
+    "бор"* "суп"*. Кавычки экранируют синтаксис FTS5."""
+    return ' '.join(f'"{term}"*' for term in split_terms(query))
+
+
+def to_tsquery_text(query):
+    """То же для to_tsquery в PostgreSQL: «бор суп» → бор:* & суп:*."""
+    return ' & '.join(f'{term}:*' for term in split_terms(query))
+
+
+def search(queryset, query):
+    """
+    Оставляет рецепты, подходящие под запрос, и сортирует их
+    по релевантности.
+
+    Релевантность доступна в аннотации search_rank (больше — лучше),
+    при равной релевантности рецепты идут по id.
+    """
+    table = RECIPE_TABLE
+    vendor = connections[queryset.db].vendor
+    if vendor in STATEMENTS and not split_terms(query):
+        return queryset.annotate(search_rank=Value(0.0)).none()
+    if vendor == 'postgresql':
+        tsquery = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        terms = to_tsquery_text(query)
+        queryset = queryset.annotate(search_rank=RawSQL(
+            f'ts_rank({table}.search_vector, {tsquery})', (terms,),
+            output_field=FloatField()
+        )).filter(RawSQL(
+            f'{table}.search_vector @@ {tsquery}', (terms,),
+            output_field=BooleanField()
+        ))
+    elif vendor == 'sqlite':
+        match = to_fts5_query(query)
+        queryset = queryset.annotate(search_rank=RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}, {SQLITE_NAME_WEIGHT}, 1.0) '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = {table}.id)', (match,),
+            output_field=FloatField()
+        )).filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        ))
+    else:
+        queryset = queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        ).annotate(search_rank=Case(
+            When(name__icontains=query, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField()
+        ))
+    return queryset.order_by('-search_rank', 'id')
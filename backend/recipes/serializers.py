@@ -1,11 +1,16 @@
-from collections import Counter
-
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
-from core.constants import MIN_COOKING_TIME, MIN_INGREDIENT_AMOUNT
+from core.constants import (MAX_BULK_RECIPES, MIN_COOKING_TIME,
+                            MIN_INGREDIENT_AMOUNT)
+from recipes import counters, feed, shopping_list
 from recipes.models import Ingredient, Recipe, RecipeIngredient
-from users.serializers import CustomUserListSerializer
+from users.serializers import (CustomUserListSerializer,
+                               SubscribedAuthorsListSerializer)
+
+User = get_user_model()
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -32,12 +37,13 @@ class IngredientAmountSerializer(serializers.Serializer):
 
     Атрибуты
     ---------
-    id : PrimaryKeyRelatedField
-        Ссылка на объект ингредиента
+    id : IntegerField
+        id ингредиента; существование всех ингредиентов рецепта
+        проверяет RecipeWriteSerializer одним запросом
     amount : IntegerField
         Количество ингредиента
     """
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField(min_value=1)
     amount = serializers.IntegerField(min_value=MIN_INGREDIENT_AMOUNT)
 
 
@@ -100,6 +106,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
+    author_id_attr = 'author_id'
+
     class Meta:
         model = Recipe
         fields = [
@@ -107,20 +115,29 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'cooking_time', 'ingredients',
             'author', 'is_favorited', 'is_in_shopping_cart'
         ]
+        list_serializer_class = SubscribedAuthorsListSerializer
 
-    def _check_user_relation(self, obj, related_manager):
-        """Проверяет наличие рецепта в favorites или shopping_carts."""
+    def _check_user_relation(self, obj, flag, related_manager):
+        """
+        Проверяет наличие рецепта в favorites или shopping_carts.
+
+        Использует аннотацию из Recipe.objects.for_read, если она есть.
+        """
+        if hasattr(obj, flag):
+            return getattr(obj, flag)
         user = self.context.get('request').user
         return (user.is_authenticated
                 and related_manager.filter(user=user).exists())
 
     def get_is_favorited(self, obj):
         """Возвращает True, если рецепт в избранном у пользователя."""
-        return self._check_user_relation(obj, obj.favorites)
+        return self._check_user_relation(obj, 'is_favorited', obj.favorites)
 
     def get_is_in_shopping_cart(self, obj):
         """Возвращает True, если рецепт в корзине пользователя."""
-        return self._check_user_relation(obj, obj.shopping_carts)
+        return self._check_user_relation(
+            obj, 'is_in_shopping_cart', obj.shopping_carts
+        )
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -155,7 +172,14 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ]
 
     def validate(self, data):
-        """Проверка списка ингредиентов на наличие, пустоту и дубликаты."""
+        """
+        Проверка списка ингредиентов на наличие, пустоту, дубликаты
+        и существование.
+
+        Все ингредиенты загружаются одним запросом, несуществующие id
+        перечисляются в одной ошибке. В validated_data id заменяются
+        объектами Ingredient.
+        """
         ingredients = data.get('ingredients')
         if ingredients is None:
             raise serializers.ValidationError({
@@ -170,6 +194,15 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 'ingredients': 'Ингредиенты не должны повторяться.'
             })
+        found = Ingredient.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            raise serializers.ValidationError({
+                'ingredients': 'Ингредиенты не найдены: '
+                + ', '.join(map(str, missing))
+            })
+        for item in ingredients:
+            item['id'] = found[item['id']]
         return data
 
     def validate_image(self, value):
@@ -179,6 +212,11 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         return value
 
     def to_representation(self, instance):
+        """Отдаёт рецепт так же, как при чтении, и тем же числом
+        запросов."""
+        instance = Recipe.objects.for_read(
+            self.context['request'].user
+        ).get(pk=instance.pk)
         return RecipeReadSerializer(
             instance, context=self.context
         ).data
@@ -194,6 +232,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             for ingredient_data in ingredients_data
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         """Создаёт рецепт и связывает его с ингредиентами."""
         ingredients_data = validated_data.pop('ingredients')
@@ -201,14 +240,68 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             author=self.context['request'].user,
             **validated_data
         )
+        counters.change(User, recipe.author_id, 'recipes_count', 1)
         self.create_ingredients(ingredients_data, recipe)
+        feed.fan_out(recipe)
         return recipe
 
     def update_ingredients(self, recipe, ingredients_data):
-        """Обновляет список ингредиентов у рецепта."""
-        recipe.recipe_ingredients.all().delete()
-        self.create_ingredients(ingredients_data, recipe)
+        """
+        Приводит ингредиенты рецепта к ingredients_data по разнице.
+
+        Текущие пары (ингредиент, количество) читаются одним запросом;
+        удаляются только убранные строки, количество меняется только
+        у изменённых, создаются только новые. Если состав не изменился,
+        в БД ничего не пишется. Списки покупок пересчитываются только
+        по затронутым ингредиентам.
+        """
+        current = {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount in
+            recipe.recipe_ingredients.order_by().values_list(
+                'id', 'ingredient_id', 'amount'
+            )
+        }
+        wanted = {
+            item['id'].pk: item['amount'] for item in ingredients_data
+        }
+        removed = current.keys() - wanted.keys()
+        added = wanted.keys() - current.keys()
+        changed = [
+            ingredient_id for ingredient_id, amount in wanted.items()
+            if ingredient_id in current
+            and current[ingredient_id][1] != amount
+        ]
+        if not (removed or added or changed):
+            return
+        if removed:
+            RecipeIngredient.objects.filter(
+                pk__in=[current[ingredient_id][0] for ingredient_id in removed]
+            ).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(
+                [
+                    RecipeIngredient(
+                        pk=current[ingredient_id][0],
+                        amount=wanted[ingredient_id]
+                    )
+                    for ingredient_id in changed
+                ],
+                ['amount']
+            )
+        if added:
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id,
+                    amount=wanted[ingredient_id]
+                )
+                for ingredient_id in added
+            )
+        shopping_list.refresh_for_recipe(
+            recipe, [*removed, *added, *changed]
+        )
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Обновляет рецепт и его ингредиенты."""
         ingredients_data = validated_data.pop('ingredients')
@@ -216,3 +309,19 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         self.update_ingredients(instance, ingredients_data)
 
         return instance
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """
+    Список id рецептов для пакетной работы с избранным и корзиной.
+
+    Повторы отбрасываются с сохранением порядка.
+    """
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_RECIPES
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
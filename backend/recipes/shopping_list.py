@@ -0,0 +1,164 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Sum
+
+from core.constants import SHOPPING_LIST_CHUNK_SIZE
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+User = get_user_model()
+
+
+class EchoBuffer:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def get_items(user):
+    """
+    Итератор по позициям списка покупок пользователя.
+
+    Читает готовые итоги из ShoppingListItem порциями: на PostgreSQL
+    через серверный курсор.
+    """
+    return (
+        ShoppingListItem.objects.filter(user=user)
+        .order_by('ingredient__name')
+        .values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'total'
+        )
+        .iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+    )
+
+
+def calculate_totals(user_ids, ingredient_ids=None):
+    """
+    Считает итоги по корзинам пользователей из исходных таблиц.
+
+    Возвращает словарь {(user_id, ingredient_id): total}.
+    """
+    source = RecipeIngredient.objects.filter(
+        recipe__shopping_carts__user__in=user_ids
+    )
+    if ingredient_ids is not None:
+        source = source.filter(ingredient__in=ingredient_ids)
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in source.values_list(
+            'recipe__shopping_carts__user', 'ingredient'
+        ).annotate(total=Sum('amount')).order_by()
+    }
+
+
+def get_stored_totals(user_ids, ingredient_ids=None):
+    """Возвращает сохранённые итоги {(user_id, ingredient_id): (id, total)}."""
+    items = ShoppingListItem.objects.filter(user__in=user_ids)
+    if ingredient_ids is not None:
+        items = items.filter(ingredient__in=ingredient_ids)
+    return {
+        (user_id, ingredient_id): (pk, total)
+        for pk, user_id, ingredient_id, total in items.values_list(
+            'id', 'user_id', 'ingredient_id', 'total'
+        )
+    }
+
+
+@transaction.atomic
+def refresh(user_ids, ingredient_ids=None):
+    """
+    Пересчитывает итоги для пар (пользователь, ингредиент).
+
+    Затрагиваются только ингредиенты из ingredient_ids (список или
+    подзапрос), без него — весь список покупок пользователей.
+    Строки пользователей блокируются, чтобы параллельные изменения
+    одной корзины не перезаписали итоги друг друга.
+    Возвращает число изменённых строк.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return 0
+    list(
+        User.objects.select_for_update().filter(pk__in=user_ids)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    if ingredient_ids is not None and not isinstance(ingredient_ids, list):
+        ingredient_ids = list(ingredient_ids)
+    expected = calculate_totals(user_ids, ingredient_ids)
+    stored = get_stored_totals(user_ids, ingredient_ids)
+    stale = [pk for key, (pk, _) in stored.items() if key not in expected]
+    changed = [
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, total=total
+        )
+        for (user_id, ingredient_id), total in expected.items()
+        if stored.get((user_id, ingredient_id), (None, None))[1] != total
+    ]
+    if stale:
+        ShoppingListItem.objects.filter(pk__in=stale).delete()
+    if changed:
+        ShoppingListItem.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['user', 'ingredient'],
+            update_fields=['total'],
+            batch_size=SHOPPING_LIST_CHUNK_SIZE
+        )
+    return len(stale) + len(changed)
+
+
+def refresh_in_chunks(user_ids, ingredient_ids=None):
+    """Пересчитывает итоги для большого числа пользователей порциями."""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), SHOPPING_LIST_CHUNK_SIZE):
+        refresh(
+            user_ids[start:start + SHOPPING_LIST_CHUNK_SIZE],
+            ingredient_ids
+        )
+
+
+def refresh_for_recipe(recipe, ingredient_ids):
+    """Пересчитывает итоги у всех, у кого рецепт лежит в корзине."""
+    refresh_in_chunks(
+        ShoppingCart.objects.filter(recipe=recipe)
+        .values_list('user_id', flat=True),
+        list(ingredient_ids)
+    )
+
+
+def render_text(items):
+    separator = ''
+    for name, unit, total in items:
+        yield f'{separator}{name} ({unit}) — {total}'
+        separator = '\n'
+
+
+def render_csv(items):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for item in items:
+        yield writer.writerow(item)
+
+
+def render_json(items):
+    separator = ''
+    yield '['
+    for name, unit, total in items:
+        yield separator + json.dumps(
+            {'name': name, 'measurement_unit': unit, 'amount': total},
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']'
+
+
+# Формат файла: (content type, функция-генератор содержимого)
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_text),
+    'csv': ('text/csv; charset=utf-8', render_csv),
+    'json': ('application/json', render_json),
+}
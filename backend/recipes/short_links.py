@@ -0,0 +1,128 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import Case, F, Value, When
+
+from core.constants import (SHORT_LINK_CACHE_TTL,
+                            SHORT_LINK_HITS_FLUSH_INTERVAL,
+                            SHORT_LINK_LOCAL_SIZE, SHORT_LINK_LOCAL_TTL,
+                            SHORT_LINK_MISSING_TTL)
+from core.shortener import decode_base62, encode_base62
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+
+class ShortLinkResolver:
+    """
+    Разрешает короткие ссылки на рецепты почти без обращений к БД.
+
+    Код — это id рецепта в base62, поэтому проверять нужно только
+    существование рецепта. Ответ хранится в LRU в памяти процесса
+    (SHORT_LINK_LOCAL_TTL секунд) и в общем кэше Django
+    (SHORT_LINK_CACHE_TTL секунд); сигналы сбрасывают его при создании
+    и удалении рецептов. Сигнал доходит только до своего процесса,
+    а кэш по умолчанию (locmem) тоже у каждого процесса свой, поэтому
+    отсутствие рецепта помнится лишь SHORT_LINK_MISSING_TTL секунд:
+    код, запрошенный до создания рецепта, быстро начинает работать
+    во всех воркерах. Переходы копятся в памяти и записываются
+    в Recipe.short_link_hits одним UPDATE раз в
+    SHORT_LINK_HITS_FLUSH_INTERVAL секунд.
+    """
+    cache_prefix = 'short-link:'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self._hits = Counter()
+        self._flushed_at = time.monotonic()
+
+    def _remember(self, recipe_id, exists, now):
+        ttl = SHORT_LINK_LOCAL_TTL if exists else SHORT_LINK_MISSING_TTL
+        with self._lock:
+            self._local[recipe_id] = (exists, now + ttl)
+            self._local.move_to_end(recipe_id)
+            while len(self._local) > SHORT_LINK_LOCAL_SIZE:
+                self._local.popitem(last=False)
+
+    def exists(self, recipe_id):
+        """Есть ли рецепт recipe_id."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(recipe_id)
+            if entry is not None and entry[1] > now:
+                self._local.move_to_end(recipe_id)
+                return entry[0]
+        key = f'{self.cache_prefix}{recipe_id}'
+        exists = cache.get(key)
+        if exists is None:
+            exists = Recipe.objects.filter(pk=recipe_id).exists()
+            cache.set(
+                key, exists,
+                SHORT_LINK_CACHE_TTL if exists else SHORT_LINK_MISSING_TTL
+            )
+        self._remember(recipe_id, exists, now)
+        return exists
+
+    def forget(self, recipe_id):
+        """Сбрасывает сохранённый ответ для рецепта."""
+        with self._lock:
+            self._local.pop(recipe_id, None)
+        cache.delete(f'{self.cache_prefix}{recipe_id}')
+
+    def get_code(self, recipe_id):
+        return encode_base62(recipe_id)
+
+    def resolve(self, code):
+        """id рецепта по коду или None, если кода или рецепта нет."""
+        try:
+            recipe_id = decode_base62(code)
+        except ValueError:
+            return None
+        return recipe_id if self.exists(recipe_id) else None
+
+    def hit(self, recipe_id):
+        """Учитывает переход; накопленное пишется в БД периодически."""
+        with self._lock:
+            self._hits[recipe_id] += 1
+            due = (
+                time.monotonic() - self._flushed_at
+                >= SHORT_LINK_HITS_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные переходы одним UPDATE."""
+        with self._lock:
+            hits, self._hits = self._hits, Counter()
+            self._flushed_at = time.monotonic()
+        if not hits:
+            return 0
+        by_count = defaultdict(list)
+        for recipe_id, count in hits.items():
+            by_count[count].append(recipe_id)
+        try:
+            Recipe.objects.filter(pk__in=list(hits)).update(
+                short_link_hits=F('short_link_hits') + Case(
+                    *(When(pk__in=ids, then=Value(count))
+                      for count, ids in by_count.items()),
+                    default=Value(0)
+                )
+            )
+        except DatabaseError:
+            logger.exception('Не удалось записать переходы по ссылкам')
+            with self._lock:
+                self._hits.update(hits)
+            return 0
+        return sum(hits.values())
+
+
+short_links = ShortLinkResolver()
+atexit.register(short_links.flush)
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import response_cache
+
+from .ingredient_index import ingredient_index
+from .models import Ingredient, IngredientCatalog, Recipe, RecipeIngredient
+from .short_links import short_links
+
+User = get_user_model()
+
+# Поля пользователя, которые не попадают в ответы о рецептах
+AUTHOR_SERVICE_FIELDS = frozenset({'last_login', 'password'})
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """
+    Обновляет версию справочника и сбрасывает индекс автодополнения.
+
+    Название и единица измерения ингредиента входят в ответы о любых
+    рецептах с ним, поэтому кэш рецептов сбрасывается целиком.
+    """
+    IngredientCatalog.bump()
+    ingredient_index.invalidate()
+    response_cache.invalidate('ingredients', 'recipes', 'recipe-details')
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    """
+    Обновляет отметку изменения рецептов автора.
+
+    Данные автора входят в ответы о рецептах, поэтому их изменение
+    должно менять ETag этих ответов.
+    """
+    if created or (
+        update_fields and AUTHOR_SERVICE_FIELDS.issuperset(update_fields)
+    ):
+        return
+    recipes = Recipe.objects.filter(author=instance)
+    recipe_ids = list(recipes.values_list('pk', flat=True))
+    if not recipe_ids:
+        return
+    recipes.update(updated_at=timezone.now())
+    response_cache.invalidate(
+        'recipes', *(f'recipe:{pk}' for pk in recipe_ids)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    """Код нового рецепта мог быть запомнен как несуществующий."""
+    if created:
+        short_links.forget(instance.pk)
+    response_cache.invalidate('recipes', f'recipe:{instance.pk}')
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    short_links.forget(instance.pk)
+    response_cache.invalidate('recipes', f'recipe:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    """
+    Обновляет отметку изменения рецепта.
+
+    Строку состава можно изменить без сохранения рецепта (инлайн
+    админки, shell), а индекс рецептов по ингредиентам (recipe_index)
+    догоняет БД по Recipe.updated_at.
+    """
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        updated_at=timezone.now()
+    )
+    response_cache.invalidate('recipes', f'recipe:{instance.recipe_id}')
@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from recipes.ingredient_index import IngredientPrefixIndex
+from recipes.models import Ingredient
+
+
+class IngredientPrefixIndexTests(TestCase):
+    """Сброс индекса не мешает запросам, которые уже читают его."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+
+    def setUp(self):
+        self.index = IngredientPrefixIndex()
+        self.index.build()
+
+    def names(self, prefix):
+        return [row['name'] for row in self.index.search(prefix)]
+
+    def test_invalidate_while_reading(self):
+        ensure_built = self.index._ensure_built
+
+        def ensure_built_and_invalidate(version):
+            snapshot = ensure_built(version)
+            self.index.invalidate()
+            return snapshot
+
+        with mock.patch.object(
+            self.index, '_ensure_built', ensure_built_and_invalidate
+        ):
+            self.assertEqual(self.names('со'), ['Соль'])
+            self.assertEqual(self.index.render('со').content.count(b'"id"'), 1)
+
+    def test_invalidate_rebuilds_on_next_read(self):
+        Ingredient.objects.create(name='Сода', measurement_unit='г')
+        self.assertEqual(self.names('со'), ['Соль'])
+        self.index.invalidate()
+        self.assertEqual(self.names('со'), ['Сода', 'Соль'])
+
+    def test_invalidate_during_build_is_not_lost(self):
+        render_rows = self.index.render_rows
+
+        def render_and_invalidate(rows):
+            self.index.invalidate()
+            Ingredient.objects.create(name='Сода', measurement_unit='г')
+            return render_rows(rows)
+
+        with mock.patch.object(
+            self.index, 'render_rows', render_and_invalidate
+        ):
+            self.index.build()
+        self.assertEqual(self.names('со'), ['Сода', 'Соль'])
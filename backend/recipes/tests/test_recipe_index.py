@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.constants import RECIPE_INDEX_SYNC_INTERVAL
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.recipe_index import IngredientRecipeIndex
+
+User = get_user_model()
+
+
+class IngredientRecipeIndexTests(TestCase):
+    """Индекс рецептов по ингредиентам и его сверка с БД."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='x'
+        )
+        cls.salt, cls.sugar = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Соль', 'Сахар')
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Суп', text='Текст',
+            image='recipes/images/test.png', cooking_time=5
+        )
+        cls.row = RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.salt, amount=5
+        )
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch(
+            'recipes.recipe_index.time.monotonic', lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = IngredientRecipeIndex()
+        self.index.build()
+
+    def test_invalidate_while_reading(self):
+        ensure_fresh = self.index._ensure_fresh
+
+        def ensure_fresh_and_invalidate():
+            state = ensure_fresh()
+            self.index.invalidate()
+            return state
+
+        with mock.patch.object(
+            self.index, '_ensure_fresh', ensure_fresh_and_invalidate
+        ):
+            self.assertEqual(
+                self.index.match([self.salt.pk]), {self.recipe.pk: (1, 1)}
+            )
+
+    def test_recipe_ingredient_change_is_synced(self):
+        self.row.ingredient = self.sugar
+        self.row.save()
+        self.now += RECIPE_INDEX_SYNC_INTERVAL + 1
+        self.assertEqual(self.index.match([self.salt.pk]), {})
+        self.assertEqual(
+            self.index.match([self.sugar.pk]), {self.recipe.pk: (1, 1)}
+        )
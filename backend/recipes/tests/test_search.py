@@ -0,0 +1,71 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from recipes.checks import check_search_index
+from recipes.models import Recipe
+from recipes.search import search, to_fts5_query, to_tsquery_text
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    """Префиксный поиск рецептов одинаков в SQLite и PostgreSQL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='x'
+        )
+        cls.borscht, cls.soup, cls.cake = (
+            Recipe.objects.create(
+                author=author, name=name, text=text,
+                image='recipes/images/test.png', cooking_time=10
+            )
+            for name, text in (
+                ('Борщ', 'Суп со свёклой'),
+                ('Грибной суп', 'С белыми грибами'),
+                ('Торт', 'Бисквит и крем'),
+            )
+        )
+
+    def find(self, query):
+        return list(search(Recipe.objects.all(), query))
+
+    def test_terms_are_prefixes(self):
+        self.assertEqual(to_fts5_query('бор, суп!'), '"бор"* "суп"*')
+        self.assertEqual(to_tsquery_text('бор, суп!'), 'бор:* & суп:*')
+        self.assertEqual(to_tsquery_text("a_b ' & |"), 'a:* & b:*')
+
+    def test_prefix_matches_word_start(self):
+        self.assertEqual(self.find('бор'), [self.borscht])
+        self.assertEqual(self.find('бискв'), [self.cake])
+
+    def test_all_terms_are_required(self):
+        self.assertEqual(self.find('гриб суп'), [self.soup])
+        self.assertEqual(self.find('борщ торт'), [])
+
+    def test_name_ranks_above_text(self):
+        self.assertEqual(self.find('суп'), [self.soup, self.borscht])
+
+    def test_query_without_terms_finds_nothing(self):
+        self.assertEqual(self.find(' "*:& '), [])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Триггеры FTS5 есть в SQLite')
+class SearchIndexCheckTests(TestCase):
+    databases = {'default'}
+
+    def test_migrations_leave_triggers_in_place(self):
+        self.assertEqual(check_search_index(None, databases=['default']), [])
+
+    def test_missing_trigger_is_reported(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER recipes_recipe_fts_update')
+        warnings = check_search_index(None, databases=['default'])
+        self.assertEqual(
+            [warning.id for warning in warnings], ['recipes.W001']
+        )
+        self.assertIn('recipes_recipe_fts_update', warnings[0].msg)
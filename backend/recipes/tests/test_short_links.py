@@ -0,0 +1,71 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.constants import (SHORT_LINK_CACHE_TTL, SHORT_LINK_LOCAL_TTL,
+                            SHORT_LINK_MISSING_TTL)
+from recipes.models import Recipe
+from recipes.short_links import ShortLinkResolver
+
+User = get_user_model()
+
+
+class ShortLinkResolverTests(TestCase):
+    """Отсутствие рецепта помнится недолго, наличие — долго."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='x'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.resolver = ShortLinkResolver()
+        self.now = 1000.0
+        patcher = mock.patch(
+            'recipes.short_links.time.monotonic', lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_recipe(self, **fields):
+        """Рецепт, о котором этот процесс не узнал (другой воркер)."""
+        with mock.patch.object(ShortLinkResolver, 'forget'):
+            return Recipe.objects.create(
+                **fields, author=self.author, name='Рецепт', text='Текст',
+                image='recipes/images/test.png', cooking_time=5
+            )
+
+    def test_missing_recipe_is_remembered_briefly(self):
+        recipe_id = Recipe.objects.count() + 1000
+        code = self.resolver.get_code(recipe_id)
+        with mock.patch('recipes.short_links.cache') as shared:
+            shared.get.return_value = None
+            self.assertIsNone(self.resolver.resolve(code))
+        shared.set.assert_called_once_with(
+            f'short-link:{recipe_id}', False, SHORT_LINK_MISSING_TTL
+        )
+        self.create_recipe(pk=recipe_id)
+        with mock.patch('recipes.short_links.cache') as shared:
+            shared.get.return_value = None
+            self.assertIsNone(self.resolver.resolve(code))
+            self.now += SHORT_LINK_MISSING_TTL + 1
+            self.assertEqual(self.resolver.resolve(code), recipe_id)
+
+    def test_existing_recipe_is_remembered_long(self):
+        recipe = self.create_recipe()
+        with mock.patch('recipes.short_links.cache') as shared:
+            shared.get.return_value = None
+            self.assertEqual(
+                self.resolver.resolve(self.resolver.get_code(recipe.pk)),
+                recipe.pk
+            )
+        shared.set.assert_called_once_with(
+            f'short-link:{recipe.pk}', True, SHORT_LINK_CACHE_TTL
+        )
+        self.now += SHORT_LINK_LOCAL_TTL - 1
+        with self.assertNumQueries(0):
+            self.resolver.resolve(self.resolver.get_code(recipe.pk))
@@ -1,39 +1,215 @@
-import tempfile
-
-from django.db.models import Sum
-from django.http import FileResponse, HttpResponse, HttpResponseNotFound
-from django.shortcuts import get_object_or_404, redirect
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max, Subquery, Value
+from django.http import (Http404, HttpResponseNotFound,
+                         HttpResponsePermanentRedirect, StreamingHttpResponse)
+from django.utils.cache import patch_cache_control
+from django.views import View
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
+from core.conditional import (ConditionalGetMixin, make_etag,
+                              prerendered_response)
+from core.constants import SHOPPING_LIST_FILENAME, SHORT_LINK_MAX_AGE
+from core.metrics import SerializationMetricsMixin
+from core.pagination import KeysetPagination, LimitOrKeysetPagination
 from core.permissions import IsAuthorOrReadOnly
+from core.projections import ProjectionListMixin
+from core.relations import create_link, create_links, delete_links
+from core.response_cache import ResponseCacheMixin
 from core.serializers import ShortRecipeSerializer
-from core.shortener import decode_base62, encode_base62
+from recipes import counters, feed, shopping_list
 from recipes.filters import IngredientFilter, RecipeFilter
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart)
-from recipes.serializers import (IngredientSerializer, RecipeReadSerializer,
-                                 RecipeWriteSerializer)
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Favorite, Ingredient, IngredientCatalog, Recipe,
+                            RecipeIngredient, ShoppingCart)
+from recipes.projections import RecipeProjection
+from recipes.serializers import (IngredientSerializer, RecipeIdsSerializer,
+                                 RecipeReadSerializer, RecipeWriteSerializer)
+from recipes.short_links import short_links
+from users.models import Subscription
+from users.subscriptions import get_subscribed_authors
+
+User = get_user_model()
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ResponseCacheMixin, ConditionalGetMixin,
+                        SerializationMetricsMixin,
+                        viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     filterset_class = IngredientFilter
 
+    def get_cache_generations(self, request):
+        return ['ingredients']
+
+    def get_list_validators(self, request):
+        """Ответ зависит только от версии справочника и фильтра."""
+        catalog = IngredientCatalog.current()
+        etag = make_etag(
+            'ingredients',
+            catalog.version,
+            request.query_params.get('name', '')
+        )
+        return etag, catalog.updated_at
+
+    def get_detail_validators(self, request):
+        catalog = IngredientCatalog.current()
+        etag = make_etag('ingredient', catalog.version, self.kwargs['pk'])
+        return etag, catalog.updated_at
+
+    def list(self, request, *args, **kwargs):
+        """
+        Справочник и поиск по началу названия отдаются готовым JSON.
+
+        Тело собирается индексом в памяти один раз на версию
+        справочника (см. recipes.ingredient_index); другие форматы,
+        например browsable API, идут обычным путём.
+        """
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        catalog = IngredientCatalog.current()
+        rendered = ingredient_index.render(
+            request.query_params.get('name', ''), version=catalog.version
+        )
+        return prerendered_response(
+            request, rendered.content, rendered.digest, rendered.encodings,
+            last_modified=catalog.updated_at
+        )
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ResponseCacheMixin, ConditionalGetMixin,
+                    ProjectionListMixin, SerializationMetricsMixin,
+                    viewsets.ModelViewSet):
     permission_classes = [
         permissions.IsAuthenticatedOrReadOnly,
         IsAuthorOrReadOnly
     ]
     queryset = Recipe.objects.all()
     filterset_class = RecipeFilter
+    pagination_class = LimitOrKeysetPagination
+
+    @property
+    def keyset_ordering(self):
+        """Курсор идёт в том же порядке, в каком фильтры выдают рецепты."""
+        if self.action == 'subscriptions_feed':
+            return ('-id',)
+        params = self.request.query_params
+        if params.get('ingredients', '').strip():
+            return ('pantry_rank', 'id')
+        if params.get('search', '').strip():
+            return ('-search_rank', 'id')
+        return ('name', 'id')
+
+    def get_cache_generations(self, request):
+        """
+        Список сбрасывается при любом изменении рецептов, а рецепт —
+        только при изменении его самого, его ингредиентов или автора
+        (см. recipes.signals).
+        """
+        if self.action == 'list':
+            return ['recipes']
+        return ['recipe-details', f'recipe:{self.kwargs["pk"]}']
+
+    def get_projection(self):
+        if self.action in ('list', 'subscriptions_feed'):
+            return RecipeProjection()
+        return None
+
+    def get_queryset(self):
+        """Для чтения подгружает связанные данные и флаги пользователя."""
+        queryset = super().get_queryset()
+        if self.request.method in SAFE_METHODS:
+            return queryset.for_read(self.request.user)
+        return queryset
+
+    def get_user_relations_stamp(self, user):
+        """
+        Отметка избранного, корзины и подписок пользователя.
+
+        Для каждой связи берутся число записей и максимальный id:
+        любое добавление увеличивает id, любое удаление уменьшает
+        число записей. Всё считается одним запросом.
+        """
+        if not user.is_authenticated:
+            return None
+        stamps = [
+            model.objects.filter(user=user).order_by().values('user')
+            .annotate(
+                kind=Value(model._meta.model_name),
+                count=Count('id'),
+                last_id=Max('id')
+            )
+            .values_list('kind', 'count', 'last_id')
+            for model in (Favorite, ShoppingCart, Subscription)
+        ]
+        return sorted(stamps[0].union(*stamps[1:], all=True))
+
+    def get_list_validators(self, request):
+        """
+        ETag списка рецептов.
+
+        Учитывает параметры запроса, число и время последнего изменения
+        отфильтрованных рецептов, версию справочника ингредиентов и
+        связи пользователя, от которых зависят его флаги.
+        """
+        recipes = self.filter_queryset(Recipe.objects.all()).aggregate(
+            count=Count('id'), updated_at=Max('updated_at')
+        )
+        etag = make_etag(
+            'recipes',
+            sorted(request.query_params.lists()),
+            recipes['count'],
+            recipes['updated_at'],
+            IngredientCatalog.current().version,
+            self.get_user_relations_stamp(request.user)
+        )
+        return etag, None
+
+    def get_detail_validators(self, request):
+        """
+        ETag и Last-Modified рецепта, считаются одним запросом.
+
+        Last-Modified отдаётся только анонимным пользователям: флаги
+        пользователя не отражаются во времени изменения рецепта.
+        """
+        catalog = IngredientCatalog.objects.filter(pk=1)
+        try:
+            recipe = (
+                Recipe.objects.filter(pk=self.kwargs['pk'])
+                .with_user_flags(request.user)
+                .annotate(
+                    catalog_version=Subquery(catalog.values('version')),
+                    catalog_updated_at=Subquery(catalog.values('updated_at'))
+                )
+                .values(
+                    'updated_at', 'author_id', 'is_favorited',
+                    'is_in_shopping_cart', 'catalog_version',
+                    'catalog_updated_at'
+                )
+                .first()
+            )
+        except (TypeError, ValueError):
+            recipe = None
+        if recipe is None:
+            return None, None
+        etag = make_etag(
+            'recipe',
+            recipe['updated_at'],
+            recipe['catalog_version'],
+            recipe['is_favorited'],
+            recipe['is_in_shopping_cart'],
+            recipe['author_id'] in get_subscribed_authors(request)
+        )
+        if request.user.is_authenticated:
+            return etag, None
+        return etag, max(
+            filter(None, (recipe['updated_at'], recipe['catalog_updated_at']))
+        )
 
     def get_serializer_class(self):
         """Определеяет какой сериализатор использовать"""
@@ -41,52 +217,132 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def perform_destroy(self, instance):
+        """Удаляет рецепт и пересчитывает списки покупок с ним."""
+        with transaction.atomic():
+            user_ids = list(
+                instance.shopping_carts.values_list('user_id', flat=True)
+            )
+            ingredient_ids = list(
+                instance.recipe_ingredients.order_by().values_list(
+                    'ingredient_id', flat=True
+                )
+            )
+            instance.delete()
+            counters.change(User, instance.author_id, 'recipes_count', -1)
+            shopping_list.refresh_in_chunks(user_ids, ingredient_ids)
+
+    def on_relations_changed(self, user, recipe_ids, model, delta):
+        """Обновляет счётчики рецептов и список покупок при изменении
+        связей пользователя с рецептами recipe_ids."""
+        counters.change_many(Recipe, recipe_ids, model.recipe_counter, delta)
+        if model is ShoppingCart:
+            shopping_list.refresh(
+                [user.pk],
+                RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+                .order_by().values_list('ingredient_id', flat=True)
+                .distinct()
+            )
+
+    @transaction.atomic
     def handle_recipe_relation(self, request, pk, model, error_text):
-        """Представляет логику для взаимодействия с корзиной и избранным"""
-        recipe = get_object_or_404(Recipe, pk=pk)
+        """
+        Добавляет рецепт в избранное или корзину (POST) либо убирает его
+        оттуда (DELETE).
+
+        Добавление — один INSERT ... ON CONFLICT DO NOTHING, который
+        заодно проверяет рецепт, поэтому повторные и одновременные
+        запросы получают 400, а не ошибку уникальности. Удаление — один
+        DELETE; наличие рецепта проверяется, только если удалять нечего.
+        """
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
         user = request.user
 
         if request.method == 'POST':
-            if model.objects.filter(user=user, recipe=recipe).exists():
+            recipe, created = create_link(
+                model, 'recipe', pk,
+                fields=('name', 'image', 'cooking_time'),
+                user_id=user.pk
+            )
+            if recipe is None:
+                raise Http404
+            if not created:
                 return Response(
                     {'errors': f'Рецепт уже {error_text}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            model.objects.create(user=user, recipe=recipe)
+            self.on_relations_changed(user, [pk], model, 1)
             serializer = ShortRecipeSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         deleted_count, _ = model.objects.filter(
-            user=user, recipe=recipe
+            user=user, recipe_id=pk
         ).delete()
         if deleted_count != 0:
+            self.on_relations_changed(user, [pk], model, -1)
             return Response(status=status.HTTP_204_NO_CONTENT)
+        if not Recipe.objects.filter(pk=pk).exists():
+            raise Http404
         return Response(
             {'errors': f'Рецепта нет {error_text}'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    def generate_shopping_cart_text(self, user):
-        """Формирует текстовое содержимое списка покупок для пользователя."""
-        ingredients = (
-            RecipeIngredient.objects.filter(recipe__shopping_carts__user=user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(total=Sum('amount'))
-            .order_by('ingredient__name')
-        )
-        lines = [
-            f"{item['ingredient__name']} "
-            f"({item['ingredient__measurement_unit']}) — "
-            f"{item['total']}"
-            for item in ingredients
-        ]
-        return '\n'.join(lines)
+    def handle_bulk_relation(self, request, model):
+        """
+        Добавляет (POST) или убирает (DELETE) сразу несколько рецептов.
+
+        Принимает {"recipes": [id, ...]} и возвращает статус по каждому
+        id: added или exists при добавлении, removed или absent при
+        удалении, not_found для несуществующих рецептов. Добавленными
+        и удалёнными считаются только строки, которые вернул
+        INSERT/DELETE ... RETURNING этого запроса, поэтому одновременные
+        одиночные и пакетные запросы не изменят счётчики дважды.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        user = request.user
+        adding = request.method == 'POST'
+
+        with transaction.atomic():
+            found = set(
+                Recipe.objects.filter(pk__in=recipe_ids)
+                .values_list('pk', flat=True)
+            )
+            change_links = create_links if adding else delete_links
+            changed = change_links(model, 'recipe', found, user_id=user.pk)
+            if changed:
+                self.on_relations_changed(
+                    user, list(changed), model, 1 if adding else -1
+                )
+
+        done, kept = ('added', 'exists') if adding else ('removed', 'absent')
+        return Response({'results': [
+            {
+                'id': pk,
+                'status': (
+                    done if pk in changed
+                    else kept if pk in found
+                    else 'not_found'
+                )
+            }
+            for pk in recipe_ids
+        ]})
 
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_short_link(self, request, pk=None):
-        """Формирует короткую ссылку для рецепта"""
-        recipe = self.get_object()
-        code = encode_base62(recipe.pk)
+        """Формирует короткую ссылку, не загружая рецепт."""
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        if not short_links.exists(pk):
+            raise Http404
+        code = short_links.get_code(pk)
         relative_url = f'/api/recipes/s/{code}/'
         short_link = request.build_absolute_uri(relative_url)
         return Response({'short-link': short_link})
@@ -105,6 +361,44 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request, pk, ShoppingCart, 'в списке покупок'
         )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='favorite/bulk'
+    )
+    def favorite_bulk(self, request):
+        """Пакетное добавление и удаление рецептов в избранном."""
+        return self.handle_bulk_relation(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='shopping_cart/bulk'
+    )
+    def shopping_cart_bulk(self, request):
+        """Пакетное добавление и удаление рецептов в корзине."""
+        return self.handle_bulk_relation(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='feed'
+    )
+    def subscriptions_feed(self, request):
+        """
+        Лента рецептов авторов, на которых подписан пользователь.
+
+        Читается из заранее записанных строк ленты (см. recipes.feed),
+        новые рецепты идут первыми; страницы листаются только курсором.
+        """
+        return self.render_list(
+            feed.get_recipes(request.user).for_read(request.user),
+            KeysetPagination()
+        )
+
     @action(
         detail=False,
         methods=['get'],
@@ -112,31 +406,46 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path='download_shopping_cart'
     )
     def download_shopping_cart(self, request):
-        user = request.user
-        content = self.generate_shopping_cart_text(user)
+        """
+        Отдаёт список покупок потоком, без временных файлов.
 
-        temp_file = tempfile.NamedTemporaryFile(
-            mode='w+', delete=False, encoding='utf-8'
+        Формат выбирается параметром file_format: txt, csv или json.
+        """
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in shopping_list.FORMATS:
+            return Response(
+                {'errors': 'Допустимые форматы: '
+                 + ', '.join(shopping_list.FORMATS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type, render = shopping_list.FORMATS[file_format]
+        response = StreamingHttpResponse(
+            render(shopping_list.get_items(request.user)),
+            content_type=content_type
         )
-        temp_file.write(content)
-        temp_file.seek(0)
-
-        response = FileResponse(
-            open(temp_file.name, 'rb'),
-            content_type='text/plain'
+        response['Content-Disposition'] = (
+            f'attachment; filename="{SHOPPING_LIST_FILENAME}.{file_format}"'
         )
-        response[
-            'Content-Disposition'
-        ] = 'attachment; filename="shopping_list.txt"'
         return response
 
 
-class ShortLinkRedirectView(APIView):
-    def get(self, request, code):
-        try:
-            recipe_id = decode_base62(code)
-        except Exception:
-            return HttpResponseNotFound("Invalid short code")
+class ShortLinkRedirectView(View):
+    """
+    Постоянный редирект с короткой ссылки на рецепт.
+
+    Рецепт проверяется через кэш short_links, ответ можно кэшировать
+    браузерам и прокси.
+    """
 
-        recipe = get_object_or_404(Recipe, pk=recipe_id)
-        return redirect(f'/api/recipes/{recipe.pk}/')
+    def get(self, request, code):
+        recipe_id = short_links.resolve(code)
+        if recipe_id is None:
+            return HttpResponseNotFound('Invalid short code')
+        short_links.hit(recipe_id)
+        response = HttpResponsePermanentRedirect(
+            f'/api/recipes/{recipe_id}/'
+        )
+        patch_cache_control(
+            response, public=True, max_age=SHORT_LINK_MAX_AGE
+        )
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_customuser_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['user', 'id'], name='subscription_user_id_idx'),
+        ),
+    ]
@@ -27,6 +27,16 @@ class CustomUser(AbstractUser):
         upload_to='users/avatars/', blank=True, null=True,
         default=None
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -59,6 +69,11 @@ class Subscription(models.Model):
                 name='prevent_self_subscription'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'id'], name='subscription_user_id_idx'
+            )
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
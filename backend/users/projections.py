@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+
+from core.projections import Projection, file_urls
+
+from .subscriptions import get_subscribed_authors
+
+User = get_user_model()
+
+
+def get_subscribed_ids(request, author_ids):
+    """Авторы из author_ids, на которых подписан пользователь запроса."""
+    authors = get_subscribed_authors(request)
+    authors.prime(author_ids)
+    return {author_id for author_id in author_ids if author_id in authors}
+
+
+class UserProjection(Projection):
+    """
+    Проекция CustomUserListSerializer.
+
+    С префиксом 'author__' собирает автора из строки рецепта.
+    """
+    user_fields = (
+        'id', 'email', 'username', 'first_name', 'last_name', 'avatar'
+    )
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.fields = tuple(prefix + field for field in self.user_fields)
+
+    def get_ids(self, rows):
+        return [row[f'{self.prefix}id'] for row in rows]
+
+    def get_builder(self, rows, request):
+        """Функция строка -> словарь пользователя для этой страницы."""
+        avatar_url = file_urls(request, User, 'avatar')
+        subscribed = get_subscribed_ids(request, self.get_ids(rows))
+        pk, email, username, first_name, last_name, avatar = self.fields
+
+        def to_dict(row):
+            return {
+                'id': row[pk],
+                'email': row[email],
+                'username': row[username],
+                'first_name': row[first_name],
+                'last_name': row[last_name],
+                'avatar': avatar_url(row[avatar]),
+                'is_subscribed': row[pk] in subscribed,
+            }
+        return to_dict
+
+    def render(self, rows, request):
+        to_dict = self.get_builder(rows, request)
+        return [to_dict(row) for row in rows]
+
+
+class SubscriptionProjection(Projection):
+    """Проекция SubscriptionSerializer."""
+    fields = (
+        'id', 'author__id', 'author__email', 'author__username',
+        'author__first_name', 'author__last_name', 'author__avatar',
+        'author__recipes_count',
+    )
+
+    def render(self, rows, request):
+        # recipes.projections сам импортирует UserProjection отсюда
+        from recipes.projections import ShortRecipeProjection
+
+        recipes_limit = request.query_params.get('recipes_limit')
+        author_ids = [row['author__id'] for row in rows]
+        recipes = ShortRecipeProjection().render_by_author(
+            author_ids, request,
+            int(recipes_limit)
+            if recipes_limit and recipes_limit.isdigit() else None
+        )
+        avatar_url = file_urls(request, User, 'avatar')
+        return [
+            {
+                'email': row['author__email'],
+                'id': row['author__id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': True,
+                'recipes': recipes[row['author__id']],
+                'recipes_count': row['author__recipes_count'],
+                'avatar': avatar_url(row['author__avatar']),
+            }
+            for row in rows
+        ]
@@ -2,6 +2,7 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.validators import RegexValidator
+from django.db import models
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
@@ -9,6 +10,7 @@ from rest_framework.validators import UniqueValidator
 from core.serializers import ShortRecipeSerializer
 
 from .models import Subscription
+from .subscriptions import get_subscribed_authors
 
 User = get_user_model()
 
@@ -64,10 +66,32 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
         return User.objects.create_user(**validated_data)
 
 
+class SubscribedAuthorsListSerializer(serializers.ListSerializer):
+    """
+    Список, заранее проверяющий подписки на всех авторов страницы.
+
+    Дочерний сериализатор указывает в author_id_attr, из какого
+    атрибута объекта брать идентификатор автора.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        request = self.context.get('request')
+        if request is not None:
+            attr = self.child.author_id_attr
+            get_subscribed_authors(request).prime(
+                getattr(item, attr) for item in data
+            )
+        return super().to_representation(data)
+
+
 class CustomUserListSerializer(serializers.ModelSerializer):
     avatar = serializers.ImageField(read_only=True)
     is_subscribed = serializers.SerializerMethodField()
 
+    author_id_attr = 'pk'
+
     class Meta:
         model = User
         fields = (
@@ -76,12 +100,11 @@ class CustomUserListSerializer(serializers.ModelSerializer):
             'avatar',
             'is_subscribed',
         )
+        list_serializer_class = SubscribedAuthorsListSerializer
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Subscription.objects.filter(user=user, author=obj).exists()
+        request = self.context.get('request')
+        return obj.pk in get_subscribed_authors(request)
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -99,7 +122,8 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     avatar = serializers.ImageField(source='author.avatar',
                                     read_only=True)
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(source='author.recipes_count',
+                                             read_only=True)
 
     class Meta:
         model = Subscription
@@ -113,15 +137,14 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        recipes = obj.author.recipes.all()
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        recipes = getattr(obj.author, 'limited_recipes', None)
+        if recipes is None:
+            recipes_limit = request.query_params.get('recipes_limit')
+            recipes = obj.author.recipes.all()
+            if recipes_limit:
+                recipes = recipes[:int(recipes_limit)]
         serializer = ShortRecipeSerializer(
             recipes,
             many=True,
             context={'request': request})
         return serializer.data
-
-    def get_recipes_count(self, obj):
-        return obj.author.recipes.count()
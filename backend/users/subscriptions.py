@@ -0,0 +1,64 @@
+from core.constants import SUBSCRIBED_AUTHORS_FULL_LOAD_LIMIT
+
+from .models import Subscription
+
+
+class SubscribedAuthors:
+    """
+    Кэш подписок пользователя в рамках одного запроса.
+
+    Если подписок немного, их идентификаторы загружаются одним
+    запросом целиком. Иначе подписки проверяются только для авторов,
+    переданных в prime() (например, для авторов текущей страницы).
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.invalidate()
+
+    def invalidate(self):
+        """Сбрасывает кэш после подписки или отписки."""
+        self._ids = None
+        self._checked = set()
+        self._complete = False
+
+    def _subscriptions(self):
+        return Subscription.objects.filter(
+            user=self.user
+        ).values_list('author_id', flat=True)
+
+    def _load(self):
+        ids = list(
+            self._subscriptions()[:SUBSCRIBED_AUTHORS_FULL_LOAD_LIMIT + 1]
+        )
+        self._ids = set(ids)
+        self._complete = len(ids) <= SUBSCRIBED_AUTHORS_FULL_LOAD_LIMIT
+
+    def prime(self, author_ids):
+        """Загружает подписки на переданных авторов одним запросом."""
+        if not self.user.is_authenticated:
+            return
+        if self._ids is None:
+            self._load()
+        if self._complete:
+            return
+        missing = set(author_ids) - self._ids - self._checked
+        if missing:
+            self._ids.update(self._subscriptions().filter(
+                author_id__in=missing
+            ))
+            self._checked.update(missing)
+
+    def __contains__(self, author_id):
+        if not self.user.is_authenticated:
+            return False
+        self.prime([author_id])
+        return author_id in self._ids
+
+
+def get_subscribed_authors(request):
+    """Возвращает кэш подписок, привязанный к текущему запросу."""
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, 'subscribed_authors'):
+        http_request.subscribed_authors = SubscribedAuthors(request.user)
+    return http_request.subscribed_authors
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class KeysetOrderingTests(APITestCase):
+    """Курсор и номера страниц выдают пользователей в одном порядке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, *cls.authors = (
+            User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@example.com',
+                password='x'
+            )
+            for number in range(4)
+        )
+        for author in cls.authors:
+            Subscription.objects.create(user=cls.reader, author=author)
+
+    def ids(self, url, key='id'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [item[key] for item in response.data['results']]
+
+    def test_users(self):
+        self.assertEqual(
+            self.ids('/api/users/?cursor='), self.ids('/api/users/?page=1')
+        )
+
+    def test_subscriptions(self):
+        self.client.force_authenticate(self.reader)
+        url = '/api/users/subscriptions/'
+        self.assertEqual(self.ids(f'{url}?cursor='), self.ids(f'{url}?page=1'))
@@ -1,20 +1,40 @@
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from core.metrics import SerializationMetricsMixin
+from core.pagination import LimitOrKeysetPagination
+from core.projections import ProjectionListMixin
+from core.relations import create_link
+from recipes import counters, feed
+from recipes.models import Recipe
+
 from .models import Subscription
+from .projections import SubscriptionProjection, UserProjection
 from .serializers import (CustomUserCreateSerializer, CustomUserListSerializer,
                           SetAvatarSerializer, SetPasswordSerializer,
                           SubscriptionSerializer)
+from .subscriptions import get_subscribed_authors
 
 User = get_user_model()
 
 
-class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+class UserViewSet(ProjectionListMixin, SerializationMetricsMixin,
+                  viewsets.ModelViewSet):
+    queryset = User.objects.order_by('id')
     permission_classes = [permissions.AllowAny]
+    pagination_class = LimitOrKeysetPagination
+
+    @property
+    def keyset_ordering(self):
+        """Курсор идёт в том же порядке, что и постраничный список."""
+        if self.action == 'subscriptions':
+            return ('-id',)
+        return ('id',)
 
     @action(
         detail=False,
@@ -49,8 +69,17 @@ class UserViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return CustomUserCreateSerializer
+        if self.action == 'subscriptions':
+            return SubscriptionSerializer
         return CustomUserListSerializer
 
+    def get_projection(self):
+        if self.action == 'list':
+            return UserProjection()
+        if self.action == 'subscriptions':
+            return SubscriptionProjection()
+        return None
+
     @action(
         detail=False,
         methods=['post'],
@@ -74,38 +103,36 @@ class UserViewSet(viewsets.ModelViewSet):
         user.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_subscriptions_queryset(self, request):
+        """
+        Подписки пользователя со всеми данными для SubscriptionSerializer.
+
+        Автор подгружается через JOIN вместе со счётчиком рецептов,
+        а первые recipes_limit рецептов каждого автора загружаются
+        одним запросом с оконной функцией.
+        """
+        recipes = Recipe.objects.order_by('name', 'id')
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes[:int(recipes_limit)]
+        return (
+            Subscription.objects.filter(user=request.user)
+            .select_related('author')
+            .prefetch_related(Prefetch(
+                'author__recipes',
+                queryset=recipes,
+                to_attr='limited_recipes'
+            ))
+            .order_by('-id')
+        )
+
     @action(
         detail=False, methods=['get'],
         url_path='subscriptions',
         permission_classes=[permissions.IsAuthenticated]
     )
     def subscriptions(self, request):
-        user = request.user
-        subscriptions = Subscription.objects.filter(user=user)
-
-        recipes_limit = request.query_params.get('recipes_limit')
-
-        page = self.paginate_queryset(subscriptions)
-        if page is not None:
-            serializer = SubscriptionSerializer(
-                page,
-                many=True,
-                context={
-                    'request': request,
-                    'recipes_limit': recipes_limit
-                }
-            )
-            return self.get_paginated_response(serializer.data)
-
-        serializer = SubscriptionSerializer(
-            subscriptions,
-            many=True,
-            context={
-                'request': request,
-                'recipes_limit': recipes_limit
-            }
-        )
-        return Response(serializer.data)
+        return self.render_list(self.get_subscriptions_queryset(request))
 
     @action(
         detail=True,
@@ -113,37 +140,62 @@ class UserViewSet(viewsets.ModelViewSet):
         permission_classes=[permissions.IsAuthenticated],
         url_path='subscribe'
     )
+    @transaction.atomic
     def subscribe(self, request, pk=None):
-        author = get_object_or_404(User, pk=pk)
+        """
+        Подписка (POST) и отписка (DELETE).
+
+        Подписка — один INSERT ... ON CONFLICT DO NOTHING, который
+        заодно проверяет автора, поэтому повторные и одновременные
+        запросы получают 400, а не ошибку уникальности. Отписка — один
+        DELETE; наличие автора проверяется, только если удалять нечего.
+        Лента подписчика дополняется рецептами автора или очищается
+        от них (см. recipes.feed).
+        """
+        try:
+            author_id = int(pk)
+        except ValueError:
+            raise Http404
         user = request.user
 
         if request.method == 'POST':
-            if author == user:
+            if author_id == user.pk:
                 return Response(
                     {'errors': 'Нельзя подписаться на самого себя.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            if Subscription.objects.filter(user=user, author=author).exists():
+            author, created = create_link(
+                Subscription, 'author', author_id, user_id=user.pk
+            )
+            if author is None:
+                raise Http404
+            if not created:
                 return Response(
                     {'errors': 'Вы уже подписаны.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            subscription = Subscription.objects.create(
-                user=user, author=author
-            )
+            counters.change(User, author_id, 'subscribers_count', 1)
+            feed.backfill(user.pk, author_id)
+            get_subscribed_authors(request).invalidate()
             serializer = SubscriptionSerializer(
-                subscription, context={'request': request}
+                self.get_subscriptions_queryset(request).get(
+                    author_id=author_id
+                ),
+                context={'request': request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if request.method == 'DELETE':
-            subscription = Subscription.objects.filter(
-                user=user, author=author
+        deleted_count, _ = Subscription.objects.filter(
+            user=user, author_id=author_id
+        ).delete()
+        if deleted_count == 0:
+            if not User.objects.filter(pk=author_id).exists():
+                raise Http404
+            return Response(
+                {'errors': 'Вы не подписаны на этого пользователя.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            if not subscription.exists():
-                return Response(
-                    {'errors': 'Вы не подписаны на этого пользователя.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            subscription.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        counters.change(User, author_id, 'subscribers_count', -1)
+        feed.trim(user.pk, author_id)
+        get_subscribed_authors(request).invalidate()
+        return Response(status=status.HTTP_204_NO_CONTENT)